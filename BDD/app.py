@@ -1,6 +1,22 @@
+import os
+import sys
+
+# The code shared by the four apps (common/) lives at the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
 from flask import Flask
+from common.cache import init_user_cache
+from common.metrics import init_metrics
+from common.models.engine import init_database
+from common.models.migrations import upgrade_schema
+from common.profiler import init_query_profiler
+from common.routes.user_routes import register_user_routes
+from common.serialization import init_fragment_caches
 from models.database import db
-from routes.user_routes import user_routes
+from models.table_version import TableVersion  # declares table_versions for db.create_all()
+from models.user import User
 from routes.product_routes import product_routes
 
 def create_app():
@@ -8,16 +24,23 @@ def create_app():
     app.config.from_object("config.Config")
 
     # Initialize database
-    db.init_app(app)
+    init_database(app, db)
+    init_metrics(app)
+    init_query_profiler(app)
     with app.app_context():
         db.create_all()  # Creates database tables if they don't exist
+        upgrade_schema()  # Adds columns and indexes missing from existing tables
+
+    init_user_cache(app)
+    init_fragment_caches(app, "users", "products")
 
     # Register blueprints
-    app.register_blueprint(user_routes, url_prefix="/api")
+    register_user_routes(app, User)
     app.register_blueprint(product_routes, url_prefix="/api")
 
     return app
 
 if __name__ == "__main__":
+    # Development server: see gunicorn.conf.py at the repository root for production
     app = create_app()
     app.run(host="0.0.0.0", port=3000)
\ No newline at end of file
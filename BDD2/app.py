@@ -1,6 +1,24 @@
+import os
+import sys
+
+# Le code partagé par les quatre applications (common/) est à la racine du dépôt
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+import click
 from flask import Flask
+from common.cache import init_user_cache
+from common.metrics import init_metrics
+from common.models.engine import init_database
+from common.profiler import init_query_profiler
+from common.routes.user_routes import register_user_routes
+from common.serialization import init_fragment_caches
 from models.database import db
-from routes.user_routes import user_routes
+from models.facture_stats import rebuild_facture_stats
+from models.migrations import upgrade_schema
+from models.table_version import TableVersion  # déclare table_versions pour db.create_all()
+from models.user import User
 from routes.facture_routes import facture_routes
 
 def create_app():
@@ -8,16 +26,29 @@ def create_app():
     app.config.from_object("config.Config")
 
     
-    db.init_app(app)
+    init_database(app, db)
+    init_metrics(app)
+    init_query_profiler(app)
     with app.app_context():
         db.create_all()  
+        upgrade_schema()
 
+    init_user_cache(app)
+    init_fragment_caches(app, "users")
     
-    app.register_blueprint(user_routes, url_prefix="/api")
+    register_user_routes(app, User)
     app.register_blueprint(facture_routes, url_prefix="/api")
 
+    @app.cli.command("rebuild-facture-stats")
+    def rebuild_facture_stats_command():
+        """Recalcule la table facture_stats à partir des factures."""
+        with db.engine.begin() as connection:
+            rebuild_facture_stats(connection)
+        click.echo("facture_stats rebuilt")
+
     return app
 
 if __name__ == "__main__":
+    # Serveur de développement : en production, voir gunicorn.conf.py à la racine
     app = create_app()
     app.run(host="0.0.0.0", port=3000)
\ No newline at end of file
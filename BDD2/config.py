@@ -6,10 +6,44 @@ class Config:
     TESTING = False
     SQLALCHEMY_DATABASE_URI = "sqlite:///app.db"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Profil du moteur appliqué par common/models/engine.py : PRAGMA exécutés à chaque
+    # nouvelle connexion, réglages du pool (fichiers de base uniquement)
+    SQLITE_PRAGMAS = {
+        "busy_timeout": 5000,  # ms d'attente d'un verrou avant "database is locked"
+        "journal_mode": "WAL",  # les lectures ne sont plus bloquées par l'écriture
+        "synchronous": "NORMAL",  # durable en WAL ; fsync aux checkpoints seulement
+        "mmap_size": 256 * 1024 * 1024,  # octets
+        "cache_size": -64000,  # négatif : en Kio, soit 64 Mo de cache de pages
+        "temp_store": "MEMORY",
+    }
+    SQLITE_POOL_SIZE = 10
+    SQLITE_MAX_OVERFLOW = 20
+    SQLITE_POOL_TIMEOUT = 30  # secondes d'attente d'une connexion du pool
+    # Expose les métriques Prometheus sur /metrics (voir common/metrics.py)
+    METRICS_ENABLED = True
+    # Journalise les requêtes SQL plus lentes que SLOW_QUERY_THRESHOLD avec leur
+    # plan d'exécution (voir common/profiler.py)
+    SLOW_QUERY_LOG_ENABLED = False
+    SLOW_QUERY_THRESHOLD = 0.1  # secondes
+    # Tables dont un parcours complet est signalé
+    SLOW_QUERY_SCAN_TABLES = ("products", "orders", "users", "factures")
+    # Nombre de factures lues par requête lors du streaming de GET /api/factures
+    FACTURE_CHUNK_SIZE = 1000
+    # Nombre de lignes par INSERT multi-lignes de POST /api/factures/batch
+    FACTURE_BATCH_CHUNK_SIZE = 500
+    # Cache en mémoire des réponses de GET /api/users/<id> (voir common/cache.py)
+    USER_CACHE_ENABLED = True
+    USER_CACHE_SIZE = 10000
+    USER_CACHE_TTL = 30  # secondes
+    # JSON encodé des lignes des listes, réutilisé tant que la version de la
+    # ligne ne change pas (voir common/serialization.py)
+    FRAGMENT_CACHE_ENABLED = True
+    FRAGMENT_CACHE_SIZE = 100000
 
 class TestConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    USER_CACHE_ENABLED = False
 
 @event.listens_for(Engine, "connect")
 def set_sqlite_pragma(dbapi_connection, connection_record):
@@ -0,0 +1,190 @@
+"""
+Import en masse de factures depuis un fichier CSV.
+
+Usage ::
+
+    python import_factures.py factures.csv [--chunk-size 50000] [--workers 4] [--rejects rejets.csv]
+
+Le fichier doit avoir une ligne d'en-tête contenant au moins ``nom_client``,
+``montant``, ``date`` (YYYY-MM-DD) et ``status`` ; les autres colonnes (par
+exemple ``id``) sont ignorées.
+
+Le fichier est lu en streaming et découpé en morceaux de ``--chunk-size``
+lignes. Chaque morceau est analysé et validé dans un pool de processus, puis
+inséré dans sa propre transaction, dans l'ordre du fichier. Le nombre de
+lignes déjà importées est enregistré dans ``facture_imports`` dans la même
+transaction que les factures : relancer la commande après une erreur reprend
+exactement après le dernier morceau validé.
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+
+from app import create_app
+from common.models.table_version import bump_version
+from models.database import db
+from models.facture import FACTURE_FIELDS, Facture, validate_facture
+from sqlalchemy import insert, text
+
+DEFAULT_CHUNK_SIZE = 50000
+
+# Réglages de la connexion d'import : on accepte de perdre la durabilité des
+# derniers commits en cas de coupure de courant (la reprise refera le morceau),
+# en échange de commits sans fsync et d'un cache de pages plus grand.
+BULK_LOAD_PRAGMAS = (
+    "PRAGMA synchronous=OFF",
+    "PRAGMA cache_size=-200000",
+    "PRAGMA temp_store=MEMORY",
+)
+
+CREATE_PROGRESS_TABLE = """
+    CREATE TABLE IF NOT EXISTS facture_imports (
+        source VARCHAR(500) PRIMARY KEY,
+        lines_done INTEGER NOT NULL
+    )
+"""
+
+SAVE_PROGRESS = """
+    INSERT INTO facture_imports (source, lines_done) VALUES (:source, :lines_done)
+    ON CONFLICT (source) DO UPDATE SET lines_done = excluded.lines_done
+"""
+
+
+def parse_chunk(header, rows, first_line):
+    """
+    Valide un morceau de lignes CSV (exécuté dans un processus du pool).
+
+    Renvoie ``(factures, rejets)`` : les valeurs prêtes pour l'INSERT et la
+    liste des ``(numéro de ligne, erreur)`` refusées.
+    """
+    factures, rejects = [], []
+    for line, row in enumerate(rows, first_line):
+        values, error = validate_facture(dict(zip(header, row)))
+        if error:
+            rejects.append((line, error))
+        else:
+            factures.append(values)
+    return factures, rejects
+
+
+def _read_chunks(reader, chunk_size):
+    while True:
+        chunk = list(islice(reader, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+@contextmanager
+def _bulk_load_connection():
+    """Connexion dédiée à l'import, réglée par BULK_LOAD_PRAGMAS."""
+    with db.engine.connect() as connection:
+        for pragma in BULK_LOAD_PRAGMAS:
+            connection.exec_driver_sql(pragma)
+        connection.commit()
+        try:
+            yield connection
+        finally:
+            # Les PRAGMA d'import ne doivent pas suivre la connexion dans le pool
+            connection.invalidate()
+
+
+def import_factures(path, chunk_size=DEFAULT_CHUNK_SIZE, workers=None, rejects_path=None, log=print):
+    """
+    Importe le fichier CSV ``path`` dans la table factures.
+
+    Doit être appelée dans un contexte d'application. Renvoie un dict avec le
+    nombre de lignes importées, rejetées, sautées (déjà importées lors d'un
+    précédent lancement) et la durée en secondes.
+    """
+    source = os.path.abspath(path)
+    workers = workers or os.cpu_count() or 1
+    report = {"imported": 0, "rejected": 0, "skipped": 0, "seconds": 0.0}
+    started = time.perf_counter()
+
+    with _bulk_load_connection() as connection:
+        with connection.begin():
+            connection.execute(text(CREATE_PROGRESS_TABLE))
+            lines_done = connection.execute(
+                text("SELECT lines_done FROM facture_imports WHERE source = :source"),
+                {"source": source}
+            ).scalar() or 0
+
+        with open(path, newline="", encoding="utf-8") as csv_file, \
+                ProcessPoolExecutor(max_workers=workers) as executor:
+            reader = csv.reader(csv_file)
+            header = next(reader, None)
+            missing = [field for field in FACTURE_FIELDS if field not in (header or ())]
+            if missing:
+                raise ValueError(f"Missing CSV columns: {', '.join(missing)}")
+
+            # Les lignes déjà importées sont relues mais ni analysées ni insérées
+            report["skipped"] = sum(1 for _ in islice(reader, lines_done))
+
+            rejects_file = open(rejects_path, "a", newline="", encoding="utf-8") if rejects_path else None
+            try:
+                pending = deque()
+                next_line = lines_done + 2  # numéro de ligne dans le fichier, en-tête compris
+                chunks = _read_chunks(reader, chunk_size)
+                while True:
+                    # Au plus deux morceaux en attente par processus : la
+                    # lecture n'avance pas plus vite que les insertions.
+                    for chunk in islice(chunks, 2 * workers - len(pending)):
+                        pending.append((len(chunk), executor.submit(parse_chunk, header, chunk, next_line)))
+                        next_line += len(chunk)
+                    if not pending:
+                        break
+
+                    size, future = pending.popleft()
+                    factures, rejects = future.result()
+                    lines_done += size
+                    with connection.begin():
+                        if factures:
+                            connection.execute(insert(Facture), factures)
+                            bump_version("factures", connection)
+                        connection.execute(text(SAVE_PROGRESS), {"source": source, "lines_done": lines_done})
+
+                    if rejects_file and rejects:
+                        csv.writer(rejects_file).writerows(rejects)
+                    report["imported"] += len(factures)
+                    report["rejected"] += len(rejects)
+                    elapsed = time.perf_counter() - started
+                    log(f"{lines_done} lines processed, {report['imported']} imported "
+                        f"({report['imported'] / elapsed:.0f} rows/s)")
+            finally:
+                if rejects_file:
+                    rejects_file.close()
+
+    report["seconds"] = time.perf_counter() - started
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import en masse de factures depuis un CSV")
+    parser.add_argument("path", help="Fichier CSV à importer")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Nombre de lignes par morceau et par transaction")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Nombre de processus d'analyse (nombre de CPU par défaut)")
+    parser.add_argument("--rejects", default=None,
+                        help="Fichier CSV où ajouter les lignes refusées (numéro de ligne, erreur)")
+    args = parser.parse_args(argv)
+
+    app = create_app()
+    with app.app_context():
+        report = import_factures(args.path, args.chunk_size, args.workers, args.rejects)
+
+    rate = report["imported"] / report["seconds"] if report["seconds"] else 0
+    print(f"Imported {report['imported']} factures, rejected {report['rejected']}, "
+          f"skipped {report['skipped']} already imported, in {report['seconds']:.1f}s ({rate:.0f} rows/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
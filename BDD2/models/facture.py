@@ -1,5 +1,41 @@
+from datetime import date, datetime
+
 from models.database import db
 from sqlalchemy import Date
+from sqlalchemy.orm import validates
+
+
+FACTURE_FIELDS = ("nom_client", "montant", "date", "status")
+
+
+def validate_facture(data, partial=False):
+    """
+    Vérifie le payload d'une facture.
+
+    Renvoie ``(valeurs, None)`` avec des valeurs prêtes pour un INSERT, ou
+    ``(None, message)`` si le payload est invalide. Avec ``partial=True``,
+    seuls les champs présents sont vérifiés et renvoyés (mise à jour partielle).
+    """
+    if not isinstance(data, dict):
+        return None, "Invalid input"
+
+    fields = [field for field in FACTURE_FIELDS if field in data] if partial else FACTURE_FIELDS
+    missing = [field for field in fields if data.get(field) in (None, "")]
+    if missing:
+        return None, f"Missing fields: {', '.join(missing)}"
+
+    values = {field: str(data[field]) for field in fields}
+    if "montant" in values:
+        try:
+            values["montant"] = float(data["montant"])
+        except (TypeError, ValueError):
+            return None, "Invalid montant"
+    if "date" in values:
+        try:
+            values["date"] = date.fromisoformat(values["date"])
+        except ValueError:
+            return None, "Invalid date"
+    return values, None
 
 
 class Facture(db.Model):
@@ -7,17 +43,25 @@ class Facture(db.Model):
     
 
     id = db.Column(db.Integer, primary_key=True)
-    nom_client = db.Column(db.String(100), nullable=False)
+    nom_client = db.Column(db.String(100), nullable=False, index=True)
     montant = db.Column(db.Float, nullable=False)
-    date = db.Column(db.String(10), nullable=False)  
-    status = db.Column(db.String(20), nullable=False)
+    date = db.Column(Date, nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, index=True)
 
+    @validates("date")
+    def validate_date(self, key, value):
+        """Accepte une date ISO ``YYYY-MM-DD`` ou un objet date/datetime."""
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, str):
+            return date.fromisoformat(value)
+        return value
 
     def to_dict(self):
         return {
             "id": self.id,
             "nom_client": self.nom_client,
             "montant": self.montant,
-            "date": self.date,
+            "date": self.date.isoformat(),
             "status": self.status
         }
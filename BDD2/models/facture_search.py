@@ -0,0 +1,69 @@
+import re
+
+from models.facture import Facture
+from sqlalchemy import DDL, event, text
+
+# Index plein texte FTS5 sur factures.nom_client. La table virtuelle est en
+# « external content » : elle ne stocke que l'index et relit nom_client dans
+# factures ; les triggers la tiennent à jour à chaque écriture.
+FACTURE_SEARCH_OBJECTS = {
+    "factures_fts": """
+        CREATE VIRTUAL TABLE IF NOT EXISTS factures_fts USING fts5(
+            nom_client,
+            content='factures',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """,
+    "factures_fts_insert": """
+        CREATE TRIGGER IF NOT EXISTS factures_fts_insert AFTER INSERT ON factures
+        BEGIN
+            INSERT INTO factures_fts (rowid, nom_client) VALUES (NEW.id, NEW.nom_client);
+        END
+    """,
+    "factures_fts_update": """
+        CREATE TRIGGER IF NOT EXISTS factures_fts_update AFTER UPDATE OF nom_client ON factures
+        BEGIN
+            INSERT INTO factures_fts (factures_fts, rowid, nom_client) VALUES ('delete', OLD.id, OLD.nom_client);
+            INSERT INTO factures_fts (rowid, nom_client) VALUES (NEW.id, NEW.nom_client);
+        END
+    """,
+    "factures_fts_delete": """
+        CREATE TRIGGER IF NOT EXISTS factures_fts_delete AFTER DELETE ON factures
+        BEGIN
+            INSERT INTO factures_fts (factures_fts, rowid, nom_client) VALUES ('delete', OLD.id, OLD.nom_client);
+        END
+    """,
+}
+
+for _statement in FACTURE_SEARCH_OBJECTS.values():
+    event.listen(Facture.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(
+    Facture.__table__, "after_drop",
+    DDL("DROP TABLE IF EXISTS factures_fts").execute_if(dialect="sqlite")
+)
+
+SEARCH_STATEMENT = text("""
+    SELECT factures.* FROM factures_fts
+    JOIN factures ON factures.id = factures_fts.rowid
+    WHERE factures_fts MATCH :query
+    ORDER BY factures_fts.rank
+    LIMIT :limit
+""")
+
+
+def rebuild_facture_search(connection):
+    """Reconstruit entièrement l'index plein texte à partir de factures."""
+    connection.execute(text("INSERT INTO factures_fts (factures_fts) VALUES ('rebuild')"))
+
+
+def search_query(terms):
+    """
+    Traduit une saisie libre en requête FTS5 : chaque mot devient un préfixe
+    (``"dup"*``) et tous les mots doivent être présents. Renvoie None si la
+    saisie ne contient aucun mot.
+    """
+    words = re.findall(r"\w+", terms)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
@@ -0,0 +1,73 @@
+from models.database import db
+from models.facture import Facture
+from sqlalchemy import DDL, event, text
+
+
+class FactureStat(db.Model):
+    """
+    Nombre et montant total des factures par statut et par mois.
+
+    La table est tenue à jour par des triggers SQLite sur ``factures`` : les
+    insertions en masse, les UPDATE ensemblistes et les imports la mettent à
+    jour au même titre que les routes CRUD.
+    """
+    __tablename__ = "facture_stats"
+
+    status = db.Column(db.String(20), primary_key=True)
+    mois = db.Column(db.String(7), primary_key=True)  # YYYY-MM
+    nombre = db.Column(db.Integer, nullable=False, default=0)
+    montant_total = db.Column(db.Float, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            "status": self.status,
+            "mois": self.mois,
+            "nombre": self.nombre,
+            "montant_total": self.montant_total
+        }
+
+
+_ADD_NEW = """
+    INSERT INTO facture_stats (status, mois, nombre, montant_total)
+    VALUES (NEW.status, substr(NEW.date, 1, 7), 1, NEW.montant)
+    ON CONFLICT (status, mois) DO UPDATE SET
+        nombre = nombre + 1,
+        montant_total = montant_total + excluded.montant_total;
+"""
+
+_REMOVE_OLD = """
+    UPDATE facture_stats
+    SET nombre = nombre - 1, montant_total = montant_total - OLD.montant
+    WHERE status = OLD.status AND mois = substr(OLD.date, 1, 7);
+    DELETE FROM facture_stats
+    WHERE status = OLD.status AND mois = substr(OLD.date, 1, 7) AND nombre <= 0;
+"""
+
+FACTURE_STATS_TRIGGERS = {
+    "factures_stats_insert": f"""
+        CREATE TRIGGER IF NOT EXISTS factures_stats_insert AFTER INSERT ON factures
+        BEGIN {_ADD_NEW} END
+    """,
+    "factures_stats_update": f"""
+        CREATE TRIGGER IF NOT EXISTS factures_stats_update
+        AFTER UPDATE OF status, date, montant ON factures
+        BEGIN {_REMOVE_OLD} {_ADD_NEW} END
+    """,
+    "factures_stats_delete": f"""
+        CREATE TRIGGER IF NOT EXISTS factures_stats_delete AFTER DELETE ON factures
+        BEGIN {_REMOVE_OLD} END
+    """,
+}
+
+for _trigger in FACTURE_STATS_TRIGGERS.values():
+    event.listen(Facture.__table__, "after_create", DDL(_trigger).execute_if(dialect="sqlite"))
+
+
+def rebuild_facture_stats(connection):
+    """Recalcule entièrement facture_stats à partir de la table factures."""
+    connection.execute(text("DELETE FROM facture_stats"))
+    connection.execute(text(
+        "INSERT INTO facture_stats (status, mois, nombre, montant_total) "
+        "SELECT status, substr(date, 1, 7), count(*), sum(montant) "
+        "FROM factures GROUP BY status, substr(date, 1, 7)"
+    ))
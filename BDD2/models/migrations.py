@@ -0,0 +1,106 @@
+from datetime import date, datetime
+
+from common.models.migrations import add_autoincrement, add_missing_columns, create_missing_indexes
+from models.database import db
+from models.facture import Facture
+from models.facture_search import FACTURE_SEARCH_OBJECTS, rebuild_facture_search
+from models.facture_stats import FACTURE_STATS_TRIGGERS, rebuild_facture_stats
+from sqlalchemy import Date, inspect, text
+
+# Objets SQLite dérivés de factures (triggers, table FTS5) qui ne font pas
+# partie des métadonnées, avec la fonction qui recalcule leur contenu.
+DERIVED_OBJECTS = (
+    (FACTURE_STATS_TRIGGERS, rebuild_facture_stats),
+    (FACTURE_SEARCH_OBJECTS, rebuild_facture_search),
+)
+
+
+# Formats de l'ancienne colonne date (VARCHAR) reconnus lors de sa conversion,
+# en plus de l'ISO ``YYYY-MM-DD``. Les dates à barres obliques sont lues jour
+# d'abord, comme elles sont saisies en France.
+LEGACY_DATE_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y/%m/%d")
+
+# Ids cités au plus dans l'erreur d'une conversion impossible
+MAX_REPORTED_IDS = 20
+
+
+def _parse_legacy_date(value):
+    """
+    La date de ``value``, lue dans l'ancienne colonne, au format ISO ; None si
+    elle n'est pas reconnue. Une heure éventuelle après la date est ignorée.
+    """
+    value = (value or "").strip()
+    try:
+        return date.fromisoformat(value[:10]).isoformat()
+    except ValueError:
+        pass
+    day = value.split(" ", 1)[0]
+    for legacy_format in LEGACY_DATE_FORMATS:
+        try:
+            return datetime.strptime(day, legacy_format).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def _rebuild_factures(connection):
+    """
+    Recrée la table factures avec le schéma courant.
+
+    SQLite ne sait pas changer le type d'une colonne : l'ancienne table est
+    renommée, la nouvelle est créée puis les lignes sont recopiées avec leur
+    date convertie au format ISO (voir ``LEGACY_DATE_FORMATS``). Si des dates
+    ne sont pas reconnues, rien n'est modifié et une ValueError cite les ids
+    des factures à corriger.
+    """
+    dates, invalid = [], []
+    for facture_id, value in connection.execute(text("SELECT id, date FROM factures")):
+        parsed = _parse_legacy_date(value)
+        if parsed is None:
+            invalid.append(facture_id)
+        elif parsed != value:
+            dates.append({"id": facture_id, "date": parsed})
+    if invalid:
+        listed = ", ".join(str(facture_id) for facture_id in invalid[:MAX_REPORTED_IDS])
+        more = f" and {len(invalid) - MAX_REPORTED_IDS} more" if len(invalid) > MAX_REPORTED_IDS else ""
+        raise ValueError(f"Cannot convert factures.date to DATE: unrecognized dates in factures {listed}{more}")
+
+    connection.execute(text("ALTER TABLE factures RENAME TO factures_old"))
+    if dates:
+        connection.execute(text("UPDATE factures_old SET date = :date WHERE id = :id"), dates)
+    Facture.__table__.create(connection)
+    connection.execute(text(
+        "INSERT INTO factures (id, nom_client, montant, date, status) "
+        "SELECT id, nom_client, montant, date, status FROM factures_old"
+    ))
+    connection.execute(text("DROP TABLE factures_old"))
+
+
+def upgrade_schema():
+    """
+    Met à niveau une base créée par une version antérieure de l'application.
+
+    ``db.create_all()`` ne crée que les tables absentes : cette fonction
+    convertit l'ancienne colonne ``factures.date`` (VARCHAR) en DATE, ajoute
+    les colonnes, l'AUTOINCREMENT et les index manquants sur les tables
+    existantes, et installe les ``DERIVED_OBJECTS`` absents (en recalculant
+    leur contenu).
+    Elle est idempotente.
+    """
+    with db.engine.begin() as connection:
+        inspector = inspect(connection)
+        if inspector.has_table("factures"):
+            columns = {column["name"]: column for column in inspector.get_columns("factures")}
+            if not isinstance(columns["date"]["type"], Date):
+                _rebuild_factures(connection)
+
+        add_missing_columns(connection, db.metadata)
+        add_autoincrement(connection, db.metadata)
+        create_missing_indexes(connection, db.metadata)
+
+        existing = set(connection.execute(text("SELECT name FROM sqlite_master")).scalars())
+        for statements, rebuild in DERIVED_OBJECTS:
+            if not existing.issuperset(statements):
+                for statement in statements.values():
+                    connection.execute(text(statement))
+                rebuild(connection)
@@ -1,25 +1,306 @@
-from flask import Blueprint, jsonify, request
-from datetime import datetime
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from datetime import date, datetime
+import csv
+import io
 import sys
 import os
+from common.models.table_version import bump_version
+from common.routes.conditional import conditional
+from common.serialization import load_fields, parse_fields, sparse_dict
 from models.database import db
-from models.facture import Facture
+from models.facture import FACTURE_FIELDS, Facture, validate_facture
+from models.facture_search import SEARCH_STATEMENT, search_query
+from models.facture_stats import FactureStat
+from sqlalchemy import insert, select, update
 from sqlalchemy.orm import Session
 
 facture_routes = Blueprint("facture_routes", __name__)
 
+def _parse_int_arg(name, minimum):
+    """Lit un paramètre entier de la query string (None s'il est absent)."""
+    raw = request.args.get(name)
+    if raw is None:
+        return None
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an integer")
+    if value < minimum:
+        raise ValueError(f"'{name}' must be >= {minimum}")
+    return value
+
+def _parse_date_arg(args, name):
+    """Lit une date ISO ``YYYY-MM-DD`` de ``args`` (None si absente)."""
+    raw = args.get(name)
+    if raw is None:
+        return None
+    try:
+        return date.fromisoformat(raw)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{name}' must be a date (YYYY-MM-DD)")
+
+def _facture_conditions(args):
+    """
+    Conditions SQL correspondant aux filtres ``from``, ``to`` (bornes
+    incluses) et ``status`` de ``args``, servies par les index sur ``date``
+    et ``status``.
+    """
+    start = _parse_date_arg(args, "from")
+    end = _parse_date_arg(args, "to")
+    status = args.get("status")
+
+    conditions = []
+    if start is not None:
+        conditions.append(Facture.date >= start)
+    if end is not None:
+        conditions.append(Facture.date <= end)
+    if status is not None:
+        conditions.append(Facture.status == status)
+    return conditions
+
+def _filtered_factures():
+    """Requête des factures restreinte par les filtres de la query string."""
+    return Facture.query.filter(*_facture_conditions(request.args))
+
+def _stream_factures(query, after, limit, chunk_size, fields=None):
+    """
+    Génère le tableau JSON des factures morceau par morceau, réduites aux
+    champs ``fields`` s'ils sont donnés.
+
+    Chaque morceau est une requête keyset (``id > dernier id vu``) bornée par
+    ``chunk_size`` : la mémoire reste constante quelle que soit la taille de
+    la table, et le premier octet part dès le premier morceau lu.
+    """
+    # La session de la vue est déjà fermée quand le générateur est parcouru :
+    # la requête est rattachée à celle du contexte de streaming, libérée à la fin
+    query = query.with_session(db.session())
+    yield "["
+    separator = ""
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = chunk_size if remaining is None else min(chunk_size, remaining)
+        chunk = query.filter(Facture.id > after).order_by(Facture.id).limit(size).all()
+        if not chunk:
+            break
+        payloads = (sparse_dict(facture, fields) if fields else facture.to_dict() for facture in chunk)
+        yield separator + ",".join(current_app.json.dumps(payload) for payload in payloads)
+        separator = ","
+        after = chunk[-1].id
+        # Les factures déjà envoyées ne doivent pas rester dans l'identity map
+        db.session.expunge_all()
+        if len(chunk) < size:
+            break
+        if remaining is not None:
+            remaining -= len(chunk)
+    yield "]"
+
 @facture_routes.route("/factures", methods=["GET"])
+@conditional("factures")
 def get_products():
     """
-    Toute les factures
+    Toute les factures, filtrées et paginées par curseur (keyset sur id)
+    ---
+    parameters:
+      - name: from
+        in: query
+        type: string
+        format: date
+        required: false
+        description: Date minimale (incluse) des factures
+      - name: to
+        in: query
+        type: string
+        format: date
+        required: false
+        description: Date maximale (incluse) des factures
+      - name: status
+        in: query
+        type: string
+        required: false
+        description: Statut exact des factures
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Nombre maximum de factures renvoyées (toutes si absent)
+      - name: after
+        in: query
+        type: integer
+        required: false
+        description: Ne renvoyer que les factures d'id strictement supérieur (id de la dernière facture de la page précédente)
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Champs à renvoyer, séparés par des virgules (id est toujours inclus)
+    responses:
+      200:
+        description: Liste JSON des factures triées par id, envoyée en streaming
+      400:
+        description: Paramètre de filtre, de pagination ou de champs invalide
+    """
+    try:
+        limit = _parse_int_arg("limit", 1)
+        after = _parse_int_arg("after", 0) or 0
+        fields = parse_fields(Facture, request.args.get("fields"))
+        query = _filtered_factures()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if fields is not None:
+        # Seules les colonnes demandées sont lues par le SELECT
+        query = load_fields(query, fields)
+    chunk_size = current_app.config["FACTURE_CHUNK_SIZE"]
+    body = _stream_factures(query, after, limit, chunk_size, fields)
+    return Response(stream_with_context(body), status=200, mimetype="application/json")
+
+EXPORT_COLUMNS = ("id", "nom_client", "montant", "date", "status")
+
+EXPORT_MIMETYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+def _export_rows(query, chunk_size):
+    """
+    Parcourt les factures sous forme de tuples, sans instancier d'objets ORM.
+
+    ``yield_per`` lit le curseur SQLite par paquets de ``chunk_size`` lignes :
+    seul le paquet courant est en mémoire.
+    """
+    columns = [getattr(Facture, name) for name in EXPORT_COLUMNS]
+    query = query.with_session(db.session())  # voir _stream_factures
+    rows = query.with_entities(*columns).order_by(Facture.id).yield_per(chunk_size)
+    for row in rows:
+        yield (row.id, row.nom_client, row.montant, row.date.isoformat(), row.status)
+
+def _stream_csv(rows, chunk_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def _stream_ndjson(rows, chunk_size):
+    lines = []
+    for row in rows:
+        lines.append(current_app.json.dumps(dict(zip(EXPORT_COLUMNS, row))))
+        if len(lines) == chunk_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+@facture_routes.route("/factures/export", methods=["GET"])
+def export_factures():
+    """
+    Export de toutes les factures en CSV ou NDJSON, envoyé en streaming
+    ---
+    parameters:
+      - name: format
+        in: query
+        type: string
+        enum: [csv, ndjson]
+        required: false
+        description: Format de l'export (csv par défaut)
+      - name: from
+        in: query
+        type: string
+        format: date
+        required: false
+      - name: to
+        in: query
+        type: string
+        format: date
+        required: false
+      - name: status
+        in: query
+        type: string
+        required: false
+    responses:
+      200:
+        description: Fichier d'export trié par id
+      400:
+        description: Format ou filtre invalide
+    """
+    export_format = request.args.get("format", "csv")
+    if export_format not in EXPORT_MIMETYPES:
+        return jsonify({"error": "format must be one of: csv, ndjson"}), 400
+    try:
+        query = _filtered_factures()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    chunk_size = current_app.config["FACTURE_CHUNK_SIZE"]
+    rows = _export_rows(query, chunk_size)
+    stream = _stream_csv if export_format == "csv" else _stream_ndjson
+    return Response(
+        stream_with_context(stream(rows, chunk_size)),
+        status=200,
+        mimetype=EXPORT_MIMETYPES[export_format],
+        headers={"Content-Disposition": f"attachment; filename=factures.{export_format}"}
+    )
+
+@facture_routes.route("/factures/stats", methods=["GET"])
+def get_facture_stats():
+    """
+    Nombre et montant total des factures par statut et par mois
+    ---
+    parameters:
+      - name: status
+        in: query
+        type: string
+        required: false
+        description: Ne renvoyer que les agrégats de ce statut
+    responses:
+      200:
+        description: Liste des agrégats triés par mois puis par statut
+    """
+    query = FactureStat.query
+    status = request.args.get("status")
+    if status is not None:
+        query = query.filter(FactureStat.status == status)
+    stats = query.order_by(FactureStat.mois, FactureStat.status).all()
+    return jsonify([stat.to_dict() for stat in stats]), 200
+
+@facture_routes.route("/factures/search", methods=["GET"])
+def search_factures():
+    """
+    Recherche plein texte des factures par nom de client
     ---
+    parameters:
+      - name: q
+        in: query
+        type: string
+        required: true
+        description: Début d'un ou plusieurs mots du nom du client (accents ignorés)
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Nombre maximum de résultats (20 par défaut)
     responses:
-      200: description: De toutes les factures dans la base de données
+      200:
+        description: Factures triées par pertinence
+      400:
+        description: Recherche vide ou limit invalide
     """
-    facture = Facture.query.all()
-    return jsonify([product.to_dict() for product in facture]), 200
+    query = search_query(request.args.get("q", ""))
+    if query is None:
+        return jsonify({"error": "q is required"}), 400
+    try:
+        limit = _parse_int_arg("limit", 1) or 20
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    statement = select(Facture).from_statement(SEARCH_STATEMENT.bindparams(query=query, limit=limit))
+    factures = db.session.scalars(statement).all()
+    return jsonify([facture.to_dict() for facture in factures]), 200
 
 @facture_routes.route("/factures/<int:facture_id>", methods=["GET"])
+@conditional("factures")
 def get_facture(facture_id):
     """
     Retrieve a facture by ID
@@ -30,14 +311,29 @@ def get_facture(facture_id):
         type: integer
         required: true
         description: ID of the facture to retrieve
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Champs à renvoyer, séparés par des virgules (id est toujours inclus)
     responses:
       200:
         description: Facture details
+      400:
+        description: Champ inconnu
       404:
         description: Facture not found
     """
-    
+    try:
+        fields = parse_fields(Facture, request.args.get("fields"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
+    if fields is not None:
+        facture = load_fields(Facture.query.filter_by(id=facture_id), fields).first()
+        if facture:
+            return jsonify(sparse_dict(facture, fields)), 200
+        return jsonify({"error": "Facture not found"}), 404
 
     session: Session = db.session 
     facture = session.get(Facture, facture_id)
@@ -53,23 +349,69 @@ def create_facture():
     if not data:
         return jsonify({"error": "Invalid input"}), 400
 
-    new_facture = Facture(
-        nom_client=data["nom_client"],
-        montant=data["montant"],
-        date=data["date"],
-        status=data["status"]
-    )
+    try:
+        new_facture = Facture(
+            nom_client=data["nom_client"],
+            montant=data["montant"],
+            date=data["date"],
+            status=data["status"]
+        )
+    except ValueError:
+        return jsonify({"error": "Invalid date"}), 400
 
     db.session.add(new_facture)
+    bump_version("factures")
+    db.session.commit()
+
+    return jsonify(new_facture.to_dict()), 201
+
+@facture_routes.route("/factures/batch", methods=["POST"])
+def create_factures_batch():
+    """
+    Crée plusieurs factures en une seule transaction
+    ---
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: array
+          items:
+            type: object
+            required: [nom_client, montant, date, status]
+    responses:
+      201:
+        description: Ids des factures créées, dans l'ordre du tableau, et erreurs par élément
+      400:
+        description: Corps invalide ou aucune facture valide
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, list) or not data:
+        return jsonify({"error": "Expected a non-empty array of factures"}), 400
+
+    # Toute la validation a lieu avant le premier INSERT : une ligne invalide
+    # est signalée par son index sans empêcher l'insertion des autres.
+    rows, errors = [], []
+    for index, item in enumerate(data):
+        values, error = validate_facture(item)
+        if error:
+            errors.append({"index": index, "error": error})
+        else:
+            rows.append(values)
+
+    if not rows:
+        return jsonify({"ids": [], "errors": errors}), 400
+
+    chunk_size = current_app.config["FACTURE_BATCH_CHUNK_SIZE"]
+    statement = insert(Facture).returning(Facture.id, sort_by_parameter_order=True)
+    ids = []
+    for start in range(0, len(rows), chunk_size):
+        result = db.session.execute(statement, rows[start:start + chunk_size])
+        ids.extend(result.scalars().all())
+    bump_version("factures")
     db.session.commit()
 
-    return jsonify({
-        "id": new_facture.id,
-        "nom_client": new_facture.nom_client,
-        "montant": new_facture.montant,
-        "date": new_facture.date,
-        "status": new_facture.status
-    }), 201
+    return jsonify({"ids": ids, "errors": errors}), 201
 
 @facture_routes.route("/factures/<int:facture_id>", methods=["PUT"])
 def update_facture(facture_id):
@@ -83,17 +425,146 @@ def update_facture(facture_id):
     facture = session.get(Facture, facture_id)
 
     if facture:
+        try:
+            facture.date = data["date"]
+        except ValueError:
+            return jsonify({"error": "Invalid date"}), 400
         facture.nom_client = data["nom_client"]
         facture.montant = data["montant"]
-        facture.date = data["date"]
         facture.status = data["status"]
 
+        bump_version("factures")
         session.commit()
 
         return jsonify(facture.to_dict()), 200
 
     return jsonify({"error": "Facture not found"}), 404
 
+@facture_routes.route("/factures/<int:facture_id>", methods=["PATCH"])
+def patch_facture(facture_id):
+    """
+    Met à jour une partie des champs d'une facture
+    ---
+    parameters:
+      - name: facture_id
+        in: path
+        type: integer
+        required: true
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            nom_client:
+              type: string
+            montant:
+              type: number
+            date:
+              type: string
+              format: date
+            status:
+              type: string
+    responses:
+      200:
+        description: Facture mise à jour
+      400:
+        description: Champ invalide ou inconnu
+      404:
+        description: Facture not found
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data:
+        return jsonify({"error": "Invalid input"}), 400
+
+    unknown = sorted(set(data) - set(FACTURE_FIELDS))
+    if unknown:
+        return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
+    values, error = validate_facture(data, partial=True)
+    if error:
+        return jsonify({"error": error}), 400
+
+    # Un seul UPDATE ... RETURNING : la facture n'est jamais chargée en session
+    statement = (
+        update(Facture)
+        .where(Facture.id == facture_id)
+        .values(**values)
+        .returning(Facture.id, Facture.nom_client, Facture.montant, Facture.date, Facture.status)
+        .execution_options(synchronize_session=False)
+    )
+    row = db.session.execute(statement).first()
+    if row is None:
+        db.session.rollback()
+        return jsonify({"error": "Facture not found"}), 404
+    bump_version("factures")
+    db.session.commit()
+
+    facture = row._asdict()
+    facture["date"] = facture["date"].isoformat()
+    return jsonify(facture), 200
+
+@facture_routes.route("/factures/status", methods=["POST"])
+def update_factures_status():
+    """
+    Change le statut de plusieurs factures en une seule requête UPDATE
+    ---
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required: [status]
+          properties:
+            status:
+              type: string
+              description: Nouveau statut
+            ids:
+              type: array
+              items:
+                type: integer
+              description: Factures à modifier
+            filter:
+              type: object
+              description: Ou bien un filtre from/to/status, comme pour GET /factures
+    responses:
+      200:
+        description: Nombre de factures modifiées
+      400:
+        description: Statut manquant, ou ni ids ni filtre valide
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data.get("status"):
+        return jsonify({"error": "status is required"}), 400
+    if ("ids" in data) == ("filter" in data):
+        return jsonify({"error": "Provide either ids or filter"}), 400
+
+    if "ids" in data:
+        ids = data["ids"]
+        if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+            return jsonify({"error": "ids must be a non-empty array of integers"}), 400
+        conditions = [Facture.id.in_(ids)]
+    else:
+        if not isinstance(data["filter"], dict):
+            return jsonify({"error": "filter must be an object"}), 400
+        try:
+            conditions = _facture_conditions(data["filter"])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if not conditions:
+            return jsonify({"error": "filter must contain from, to or status"}), 400
+
+    statement = (
+        update(Facture)
+        .where(*conditions)
+        .values(status=str(data["status"]))
+        .execution_options(synchronize_session=False)
+    )
+    result = db.session.execute(statement)
+    bump_version("factures")
+    db.session.commit()
+    return jsonify({"updated": result.rowcount}), 200
+
 @facture_routes.route("/factures/<int:facture_id>", methods=["DELETE"])
 def delete_facture(facture_id):
     """Delete a facture by ID."""
@@ -102,6 +573,7 @@ def delete_facture(facture_id):
     
     if facture:
         session.delete(facture)
+        bump_version("factures")
         session.commit()
         return jsonify({"message": "Facture deleted"}), 204
 
@@ -1,53 +0,0 @@
-from flask import Blueprint, request, jsonify
-from models.database import db
-from models.user import User
-
-user_routes = Blueprint("user_routes", __name__)
-
-@user_routes.route("/users", methods=["GET"])
-def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users]), 200
-
-@user_routes.route("/users/<int:user_id>", methods=["GET"])
-def get_user(user_id):
-    user = User.query.get(user_id)
-    if user:
-        return jsonify(user.to_dict()), 200
-    return jsonify({"error": "User not found"}), 404
-
-@user_routes.route("/users", methods=["POST"])
-def create_user():
-    data = request.get_json()
-    if not data.get("name") or not data.get("email"):
-        return jsonify({"error": "Name and email are required"}), 400
-
-    if User.query.filter_by(email=data["email"]).first():
-        return jsonify({"error": "Email already exists"}), 400
-
-    new_user = User(name=data["name"], email=data["email"])
-    db.session.add(new_user)
-    db.session.commit()
-    return jsonify(new_user.to_dict()), 201
-
-@user_routes.route("/users/<int:user_id>", methods=["PUT"])
-def update_user(user_id):
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-
-    data = request.get_json()
-    user.name = data.get("name", user.name)
-    user.email = data.get("email", user.email)
-    db.session.commit()
-    return jsonify(user.to_dict()), 200
-
-@user_routes.route("/users/<int:user_id>", methods=["DELETE"])
-def delete_user(user_id):
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-
-    db.session.delete(user)
-    db.session.commit()
-    return jsonify({"message": "User deleted successfully"}), 200
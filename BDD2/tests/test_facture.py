@@ -1,3 +1,6 @@
+import gc
+import json
+import re
 import unittest
 from datetime import datetime
 import sys
@@ -9,6 +12,8 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../"
 from app import create_app
 from models.facture import Facture
 from models.database import db
+from models.migrations import upgrade_schema
+from sqlalchemy import Date, inspect, text
 
 class FactureTestCase(unittest.TestCase):
     def setUp(self):
@@ -134,4 +139,369 @@ class FactureTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 204)
 
         response = self.client.get(f"/api/factures/{facture_id}")
-        self.assertEqual(response.status_code, 404)
\ No newline at end of file
+        self.assertEqual(response.status_code, 404)
+
+    def _add_factures(self, count):
+        with self.app.app_context():
+            for i in range(count):
+                db.session.add(Facture(
+                    nom_client=f"Client {i}",
+                    montant=10.0 * (i + 1),
+                    date="2024-01-01",
+                    status="En attente"
+                ))
+            db.session.commit()
+
+    def test_get_factures_streamed_in_chunks(self):
+        """Test que toutes les factures sont renvoyées quand la table dépasse un morceau"""
+        self.app.config["FACTURE_CHUNK_SIZE"] = 2
+        self._add_factures(5)
+
+        response = self.client.get("/api/factures")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([f["nom_client"] for f in response.json],
+                         [f"Client {i}" for i in range(5)])
+
+    def test_get_factures_keyset_pagination(self):
+        """Test de la pagination par curseur avec limit et after"""
+        self.app.config["FACTURE_CHUNK_SIZE"] = 2
+        self._add_factures(5)
+
+        first_page = self.client.get("/api/factures?limit=3").json
+        self.assertEqual(len(first_page), 3)
+
+        second_page = self.client.get(f"/api/factures?limit=3&after={first_page[-1]['id']}").json
+        self.assertEqual(len(second_page), 2)
+        self.assertGreater(second_page[0]["id"], first_page[-1]["id"])
+
+        last_page = self.client.get(f"/api/factures?limit=3&after={second_page[-1]['id']}").json
+        self.assertEqual(last_page, [])
+
+    def test_get_factures_sparse_fields(self):
+        """Test de fields= sur la liste (en streaming) et le détail des factures"""
+        self.app.config["FACTURE_CHUNK_SIZE"] = 2
+        self._add_factures(3)
+
+        response = self.client.get("/api/factures?fields=nom_client")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, [{"id": i + 1, "nom_client": f"Client {i}"} for i in range(3)])
+
+        facture = self.client.get("/api/factures/1?fields=date,montant").json
+        self.assertEqual(sorted(facture), ["date", "id", "montant"])
+
+        for url in ("/api/factures?fields=client", "/api/factures/1?fields=montant,tva"):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn("error", response.json)
+
+    def test_streamed_responses_release_connection(self):
+        """Test que les réponses en streaming rendent leur connexion au pool"""
+        self._add_factures(3)
+        # Une session orpheline reste dans un cycle de références : sans le
+        # ramasse-miettes, sa connexion n'est rendue que si elle est fermée
+        gc.disable()
+        try:
+            for url in ("/api/factures", "/api/factures?fields=status", "/api/factures/export?format=csv"):
+                response = self.client.get(url, buffered=False)
+                self.assertEqual(response.status_code, 200)
+                response.get_data()
+                response.close()
+            with self.app.app_context():
+                self.assertEqual(db.engine.pool.checkedout(), 0)
+        finally:
+            gc.enable()
+
+    def test_streamed_responses_metrics(self):
+        """Test que /metrics compte les requêtes SQL et la durée du corps envoyé en streaming"""
+        self._add_factures(5)
+        self.app.config["FACTURE_CHUNK_SIZE"] = 2
+        # buffered=True : le client lit puis ferme la réponse, comme un serveur WSGI
+        self.client.get("/api/factures", buffered=True)
+        self.client.get("/api/factures/export?format=csv", buffered=True)
+
+        body = self.client.get("/metrics").get_data(as_text=True)
+        # La liste lit trois morceaux de 2 factures au plus, l'export un seul
+        # SELECT parcouru par paquets : tous pendant le streaming
+        for route, minimum in (("/api/factures", 3), ("/api/factures/export", 1)):
+            labels = f'route="{route}",method="GET"'
+            self.assertIn(f"http_request_duration_seconds_count{{{labels}}} 1", body)
+            statements = re.search(rf"^db_statements_total{{{re.escape(labels)}}} (\d+)$", body, re.M)
+            self.assertGreaterEqual(int(statements.group(1)), minimum, route)
+
+    def test_get_factures_invalid_pagination(self):
+        """Test qu'un paramètre de pagination invalide renvoie 400"""
+        for query in ("limit=0", "limit=abc", "after=-1"):
+            response = self.client.get(f"/api/factures?{query}")
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("error", response.json)
+
+    def test_get_factures_filtered_by_date_and_status(self):
+        """Test du filtre from/to/status sur la liste des factures"""
+        with self.app.app_context():
+            for day, status in (("2024-01-31", "Payée"), ("2024-02-01", "Payée"),
+                                ("2024-02-29", "En attente"), ("2024-03-01", "Payée")):
+                db.session.add(Facture(nom_client="Client", montant=1.0, date=day, status=status))
+            db.session.commit()
+
+        response = self.client.get("/api/factures?from=2024-02-01&to=2024-02-29")
+        self.assertEqual([f["date"] for f in response.json], ["2024-02-01", "2024-02-29"])
+
+        response = self.client.get("/api/factures?from=2024-02-01&status=Pay%C3%A9e")
+        self.assertEqual([f["date"] for f in response.json], ["2024-02-01", "2024-03-01"])
+
+        response = self.client.get("/api/factures?from=01/02/2024")
+        self.assertEqual(response.status_code, 400)
+
+    def test_date_range_uses_index(self):
+        """Test que le filtre par dates est servi par l'index sur factures.date"""
+        with self.app.app_context():
+            plan = db.session.execute(text(
+                "EXPLAIN QUERY PLAN SELECT * FROM factures "
+                "WHERE date >= '2024-02-01' AND date <= '2024-02-29' AND id > 0 ORDER BY id LIMIT 1000"
+            )).fetchall()
+        self.assertIn("USING INDEX ix_factures_date", " ".join(row[-1] for row in plan))
+
+    def test_create_facture_invalid_date(self):
+        """Test qu'une date non ISO est refusée"""
+        response = self.client.post("/api/factures", json={
+            "nom_client": "Client F", "montant": 1.0, "date": "01/12/2022", "status": "En attente"
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def _create_legacy_factures(self, *dates):
+        """Remplace la table factures par l'ancienne (date en VARCHAR), une facture par date à partir de l'id 7"""
+        db.session.execute(text("DROP TABLE factures"))
+        db.session.execute(text(
+            "CREATE TABLE factures (id INTEGER PRIMARY KEY, nom_client VARCHAR(100) NOT NULL, "
+            "montant FLOAT NOT NULL, date VARCHAR(10) NOT NULL, status VARCHAR(20) NOT NULL)"
+        ))
+        for facture_id, value in enumerate(dates, start=7):
+            db.session.execute(text(
+                "INSERT INTO factures VALUES (:id, 'Ancien client', 12.5, :date, 'Payée')"
+            ), {"id": facture_id, "date": value})
+        db.session.commit()
+
+    def _drop_legacy_factures(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.session.execute(text("DROP TABLE factures"))
+            db.session.commit()
+
+    def test_upgrade_schema_converts_legacy_date_column(self):
+        """Test de la migration d'une table factures avec date en VARCHAR"""
+        with self.app.app_context():
+            self._create_legacy_factures("2020-05-04 00:00:00", "01/12/2022")
+
+            upgrade_schema()
+
+            inspector = inspect(db.engine)
+            date_column = next(c for c in inspector.get_columns("factures") if c["name"] == "date")
+            self.assertIsInstance(date_column["type"], Date)
+            self.assertIn("ix_factures_date", {i["name"] for i in inspector.get_indexes("factures")})
+
+        response = self.client.get("/api/factures/7")
+        self.assertEqual(response.json["date"], "2020-05-04")
+        response = self.client.get("/api/factures/8")
+        self.assertEqual(response.json["date"], "2022-12-01")
+        self.assertEqual(self.client.get("/api/factures").status_code, 200)
+
+    def test_upgrade_schema_rejects_unrecognized_legacy_dates(self):
+        """Test qu'une date ancienne illisible arrête la migration sans rien modifier"""
+        # La base de test est partagée : la table non migrée ne doit pas rester
+        self.addCleanup(self._drop_legacy_factures)
+        with self.app.app_context():
+            self._create_legacy_factures("2020-05-04", "bientôt", "31/02/2022")
+            with self.assertRaises(ValueError) as raised:
+                upgrade_schema()
+            self.assertIn("unrecognized dates in factures 8, 9", str(raised.exception))
+
+            db.session.remove()
+            inspector = inspect(db.engine)
+            self.assertNotIn("factures_old", inspector.get_table_names())
+            date_column = next(c for c in inspector.get_columns("factures") if c["name"] == "date")
+            self.assertNotIsInstance(date_column["type"], Date)
+
+    def test_create_factures_batch(self):
+        """Test de la création de factures par lot avec erreurs par élément"""
+        self.app.config["FACTURE_BATCH_CHUNK_SIZE"] = 2
+        payload = [
+            {"nom_client": "Lot 1", "montant": 10, "date": "2024-04-01", "status": "En attente"},
+            {"nom_client": "Lot 2", "montant": 20, "date": "2024-04-02", "status": "En attente"},
+            {"nom_client": "Lot 3", "montant": "abc", "date": "2024-04-03", "status": "En attente"},
+            {"nom_client": "Lot 4", "montant": 40, "date": "2024-04-04", "status": "En attente"},
+            {"nom_client": "Lot 5", "date": "2024-04-05", "status": "En attente"},
+        ]
+        response = self.client.post("/api/factures/batch", json=payload)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json["ids"]), 3)
+        self.assertEqual([e["index"] for e in response.json["errors"]], [2, 4])
+
+        for facture_id, name in zip(response.json["ids"], ("Lot 1", "Lot 2", "Lot 4")):
+            self.assertEqual(self.client.get(f"/api/factures/{facture_id}").json["nom_client"], name)
+
+    def test_create_factures_batch_invalid(self):
+        """Test qu'un lot vide ou sans facture valide est refusé"""
+        self.assertEqual(self.client.post("/api/factures/batch", json=[]).status_code, 400)
+        self.assertEqual(self.client.post("/api/factures/batch", json={"nom_client": "x"}).status_code, 400)
+
+        response = self.client.post("/api/factures/batch", json=[{"nom_client": "x"}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json["ids"], [])
+        self.assertEqual(len(response.json["errors"]), 1)
+
+    def test_facture_stats_follow_writes(self):
+        """Test que les agrégats par statut et par mois suivent create/update/delete"""
+        self.client.post("/api/factures/batch", json=[
+            {"nom_client": "A", "montant": 100, "date": "2024-01-10", "status": "En attente"},
+            {"nom_client": "B", "montant": 50, "date": "2024-01-20", "status": "En attente"},
+        ])
+        created = self.client.post("/api/factures", json={
+            "nom_client": "C", "montant": 25, "date": "2024-02-01", "status": "Payée"
+        }).json
+        self.client.put(f"/api/factures/{created['id']}", json={
+            "nom_client": "C", "montant": 30, "date": "2024-01-31", "status": "En attente"
+        })
+
+        stats = self.client.get("/api/factures/stats").json
+        self.assertEqual(stats, [
+            {"status": "En attente", "mois": "2024-01", "nombre": 3, "montant_total": 180.0}
+        ])
+
+        self.client.delete(f"/api/factures/{created['id']}")
+        stats = self.client.get("/api/factures/stats?status=En%20attente").json
+        self.assertEqual(stats[0]["nombre"], 2)
+        self.assertEqual(stats[0]["montant_total"], 150.0)
+
+    def test_rebuild_facture_stats_command(self):
+        """Test de la commande de reconstruction de facture_stats"""
+        self._add_factures(3)
+        with self.app.app_context():
+            db.session.execute(text("DELETE FROM facture_stats"))
+            db.session.commit()
+
+        result = self.app.test_cli_runner().invoke(args=["rebuild-facture-stats"])
+        self.assertEqual(result.exit_code, 0)
+
+        stats = self.client.get("/api/factures/stats").json
+        self.assertEqual(stats, [
+            {"status": "En attente", "mois": "2024-01", "nombre": 3, "montant_total": 60.0}
+        ])
+
+    def test_export_factures_csv(self):
+        """Test de l'export CSV filtré"""
+        self.app.config["FACTURE_CHUNK_SIZE"] = 2
+        self._add_factures(3)
+        self.client.post("/api/factures", json={
+            "nom_client": "Hors période", "montant": 5, "date": "2023-12-31", "status": "En attente"
+        })
+
+        response = self.client.get("/api/factures/export?format=csv&from=2024-01-01")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/csv")
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(lines[0], "id,nom_client,montant,date,status")
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[1].endswith(",Client 0,10.0,2024-01-01,En attente"))
+
+    def test_export_factures_ndjson(self):
+        """Test de l'export NDJSON et du refus d'un format inconnu"""
+        self.app.config["FACTURE_CHUNK_SIZE"] = 2
+        self._add_factures(3)
+
+        response = self.client.get("/api/factures/export?format=ndjson")
+        self.assertEqual(response.status_code, 200)
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([row["nom_client"] for row in rows], ["Client 0", "Client 1", "Client 2"])
+        self.assertEqual(rows[0]["date"], "2024-01-01")
+
+        self.assertEqual(self.client.get("/api/factures/export?format=xml").status_code, 400)
+
+    def test_patch_facture(self):
+        """Test de la mise à jour partielle d'une facture"""
+        created = self.client.post("/api/factures", json={
+            "nom_client": "Client G", "montant": 70, "date": "2024-06-01", "status": "En attente"
+        }).json
+
+        response = self.client.patch(f"/api/factures/{created['id']}", json={"status": "Payée"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, dict(created, status="Payée"))
+
+        response = self.client.patch(f"/api/factures/{created['id']}", json={"date": "juin"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch(f"/api/factures/{created['id']}", json={"couleur": "bleu"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch("/api/factures/999", json={"status": "Payée"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_update_factures_status_by_ids(self):
+        """Test du changement de statut en masse par liste d'ids"""
+        ids = self.client.post("/api/factures/batch", json=[
+            {"nom_client": f"Client {i}", "montant": 1, "date": "2024-07-01", "status": "En attente"}
+            for i in range(3)
+        ]).json["ids"]
+
+        response = self.client.post("/api/factures/status", json={"ids": ids[:2], "status": "Payée"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["updated"], 2)
+        statuses = [self.client.get(f"/api/factures/{i}").json["status"] for i in ids]
+        self.assertEqual(statuses, ["Payée", "Payée", "En attente"])
+
+    def test_update_factures_status_by_filter(self):
+        """Test du changement de statut en masse par filtre"""
+        self.client.post("/api/factures/batch", json=[
+            {"nom_client": "Mai", "montant": 1, "date": "2024-05-15", "status": "En attente"},
+            {"nom_client": "Juin", "montant": 1, "date": "2024-06-15", "status": "En attente"},
+        ])
+
+        response = self.client.post("/api/factures/status", json={
+            "filter": {"to": "2024-05-31", "status": "En attente"}, "status": "En retard"
+        })
+        self.assertEqual(response.json["updated"], 1)
+        self.assertEqual([f["nom_client"] for f in self.client.get("/api/factures?status=En%20retard").json], ["Mai"])
+
+        for payload in ({"status": "Payée"}, {"status": "Payée", "filter": {}},
+                        {"status": "Payée", "ids": ["a"]}, {"ids": [1]}):
+            self.assertEqual(self.client.post("/api/factures/status", json=payload).status_code, 400)
+
+    def test_search_factures(self):
+        """Test de la recherche plein texte par préfixe sur nom_client"""
+        self.client.post("/api/factures/batch", json=[
+            {"nom_client": name, "montant": 1, "date": "2024-08-01", "status": "En attente"}
+            for name in ("Société Dupont", "Dupuis SARL", "Martin & Fils")
+        ])
+
+        response = self.client.get("/api/factures/search?q=dup")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(f["nom_client"] for f in response.json), ["Dupuis SARL", "Société Dupont"])
+
+        response = self.client.get("/api/factures/search?q=societe%20dupo")
+        self.assertEqual([f["nom_client"] for f in response.json], ["Société Dupont"])
+
+        self.assertEqual(self.client.get("/api/factures/search?q=%22%20*").status_code, 400)
+
+    def test_search_factures_follows_writes(self):
+        """Test que l'index plein texte suit les modifications et suppressions"""
+        created = self.client.post("/api/factures", json={
+            "nom_client": "Durand", "montant": 1, "date": "2024-08-01", "status": "En attente"
+        }).json
+        self.client.patch(f"/api/factures/{created['id']}", json={"nom_client": "Bernard"})
+
+        self.assertEqual(self.client.get("/api/factures/search?q=durand").json, [])
+        self.assertEqual(len(self.client.get("/api/factures/search?q=bern").json), 1)
+
+        self.client.delete(f"/api/factures/{created['id']}")
+        self.assertEqual(self.client.get("/api/factures/search?q=bern").json, [])
+
+    def test_factures_etag(self):
+        """Test des requêtes conditionnelles sur la liste des factures"""
+        self._add_factures(2)
+        etag = self.client.get("/api/factures").headers["ETag"]
+        response = self.client.get("/api/factures", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+        # Chaque combinaison de paramètres a son propre ETag
+        self.assertNotEqual(self.client.get("/api/factures?limit=1").headers["ETag"], etag)
+
+        self.client.post("/api/factures/status", json={"filter": {"status": "En attente"}, "status": "Payée"})
+        response = self.client.get("/api/factures", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,70 @@
+import csv
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+from app import create_app
+from import_factures import CREATE_PROGRESS_TABLE, import_factures
+from models.database import db
+from models.facture import Facture
+from sqlalchemy import text
+
+
+class ImportFacturesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.drop_all()
+            db.session.execute(text("DROP TABLE IF EXISTS facture_imports"))
+            db.create_all()
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.tmpdir.name, "factures.csv")
+        with open(self.csv_path, "w", newline="", encoding="utf-8") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["id", "nom_client", "montant", "date", "status"])
+            for i in range(7):
+                writer.writerow([1000 + i, f"Client {i}", 10 * i, "2024-05-01", "En attente"])
+            writer.writerow([2000, "Client invalide", 5, "05/01/2024", "En attente"])
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_import_factures(self):
+        """Test de l'import d'un CSV par morceaux avec rejet des lignes invalides"""
+        rejects_path = os.path.join(self.tmpdir.name, "rejets.csv")
+        with self.app.app_context():
+            report = import_factures(self.csv_path, chunk_size=3, workers=2,
+                                     rejects_path=rejects_path, log=lambda message: None)
+            names = [f.nom_client for f in Facture.query.order_by(Facture.id)]
+
+        self.assertEqual(report["imported"], 7)
+        self.assertEqual(report["rejected"], 1)
+        self.assertEqual(names, [f"Client {i}" for i in range(7)])
+        with open(rejects_path, encoding="utf-8") as rejects_file:
+            self.assertEqual(list(csv.reader(rejects_file)), [["9", "Invalid date"]])
+
+    def test_import_factures_resumes(self):
+        """Test que relancer l'import reprend après les lignes déjà importées"""
+        with self.app.app_context():
+            db.session.execute(text(CREATE_PROGRESS_TABLE))
+            db.session.execute(
+                text("INSERT INTO facture_imports VALUES (:source, 3)"),
+                {"source": os.path.abspath(self.csv_path)}
+            )
+            db.session.commit()
+
+            report = import_factures(self.csv_path, chunk_size=3, workers=1, log=lambda message: None)
+            self.assertEqual(report["skipped"], 3)
+            self.assertEqual(report["imported"], 4)
+
+            report = import_factures(self.csv_path, chunk_size=3, workers=1, log=lambda message: None)
+            self.assertEqual(report["imported"], 0)
+            self.assertEqual(Facture.query.count(), 4)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,14 +1,24 @@
 from models.database import db
+from sqlalchemy import literal_column
 from datetime import datetime
 
 class Order(db.Model):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Status filter with newest-first ordering on GET /api/orders
+        db.Index("ix_orders_status_order_date", "status", "order_date"),
+        # Ids of deleted orders are never reused: they key cached JSON fragments
+        {"sqlite_autoincrement": True},
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    customer_name = db.Column(db.String(100), nullable=False)
-    order_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    customer_name = db.Column(db.String(100), nullable=False, index=True)
+    order_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
     total_amount = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(20), nullable=False, default="pending")
+    # Incremented by every UPDATE; keys the cached JSON fragment of the row
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1",
+                        onupdate=literal_column("version + 1"))
 
     def to_dict(self):
         return {
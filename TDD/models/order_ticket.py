@@ -0,0 +1,24 @@
+from models.database import db
+from datetime import datetime
+
+class OrderTicket(db.Model):
+    """
+    Outcome of an order queued in write-behind mode, written in the same
+    transaction as the order so that any worker can answer a poll.
+    """
+    __tablename__ = "order_tickets"
+
+    ticket = db.Column(db.String(32), primary_key=True)
+    status = db.Column(db.String(20), nullable=False)  # committed or failed
+    order_id = db.Column(db.Integer, nullable=True)
+    error = db.Column(db.String(200), nullable=True)
+    # Tickets older than ORDER_TICKET_RETENTION are deleted by the writer
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def to_dict(self):
+        state = {"ticket": self.ticket, "status": self.status}
+        if self.order_id is not None:
+            state["order_id"] = self.order_id
+        if self.error is not None:
+            state["error"] = self.error
+        return state
@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import Counter
+
+from common.models.table_version import version_subquery
+from models.database import db
+from models.order import Order
+from sqlalchemy import func, select, true
+
+# Statuses always reported by GET /orders/status-counts, even when zero
+ORDER_STATUSES = ("pending", "processing", "shipped", "delivered", "cancelled")
+
+
+class StatusCounters:
+    """
+    Number of orders per status, kept in memory.
+
+    The counters are seeded with one GROUP BY and then moved by ``apply()``
+    after every committed status transition. Writes made by another process,
+    or directly in the database, are not seen: a background thread recounts
+    from the database every ``reconcile_interval`` seconds to correct the
+    drift.
+
+    Each transition carries the version of the ``orders`` table its
+    transaction committed (see ``bump_version``), and a recount reads the
+    version its snapshot reflects along with the counts. Transitions already
+    in the snapshot are dropped and later ones are applied on top of it, so
+    an ``apply()`` racing a recount is counted exactly once.
+    """
+
+    def __init__(self, app, reconcile_interval):
+        self.app = app
+        self.reconcile_interval = reconcile_interval
+        self._counts = Counter()
+        self._version = -1  # version of the orders table the counts are based on
+        self._transitions = []  # (version, old, new) applied since that version
+        self._lock = threading.Lock()
+        self._reconcile_lock = threading.Lock()
+        self._thread = None
+
+    def reconcile(self):
+        """Replace the counters with a GROUP BY over the orders table. Needs an app context."""
+        counts = select(Order.status, func.count(Order.id).label("count")).group_by(Order.status).subquery()
+        version = select(version_subquery("orders").label("version")).subquery()
+        # One statement, so the counts and the version come from the same snapshot
+        statement = select(version.c.version, counts.c.status, counts.c.count).select_from(
+            version.outerjoin(counts, true())
+        )
+        with self._reconcile_lock:
+            rows = db.session.execute(statement).all()
+            snapshot_version = rows[0].version
+            snapshot = Counter({row.status: row.count for row in rows if row.status is not None})
+            with self._lock:
+                if snapshot_version < self._version:
+                    return
+                self._transitions = [t for t in self._transitions if t[0] > snapshot_version]
+                for _, old_status, new_status in self._transitions:
+                    _move(snapshot, old_status, new_status)
+                self._counts = snapshot
+                self._version = snapshot_version
+
+    def apply(self, old_status, new_status, version):
+        """
+        Record a transition committed with ``version`` of the orders table;
+        ``old_status`` is None for a new order, ``new_status`` None for a
+        deleted one.
+        """
+        self._start()
+        if old_status == new_status:
+            return
+        with self._lock:
+            if version <= self._version:
+                return
+            _move(self._counts, old_status, new_status)
+            self._transitions.append((version, old_status, new_status))
+
+    def counts(self):
+        """Return the counters by status."""
+        self._start()
+        with self._lock:
+            counts = dict.fromkeys(ORDER_STATUSES, 0)
+            counts.update((status, count) for status, count in self._counts.items() if count)
+            return counts
+
+    def _start(self):
+        # Started on first use rather than by init_order_counters(): a thread of
+        # the process that built the app does not survive a fork into workers
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="order-counts", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.reconcile_interval)
+            try:
+                with self.app.app_context():
+                    self.reconcile()
+            except Exception:
+                self.app.logger.exception("Order status counts reconciliation failed")
+
+
+def _move(counts, old_status, new_status):
+    if old_status is not None:
+        counts[old_status] -= 1
+    if new_status is not None:
+        counts[new_status] += 1
+
+
+def init_order_counters(app):
+    """Attach the order status counters to ``app`` and seed them from its database."""
+    counters = StatusCounters(app, app.config["ORDER_COUNTS_RECONCILE_INTERVAL"])
+    with app.app_context():
+        counters.reconcile()
+    app.extensions["order_counters"] = counters
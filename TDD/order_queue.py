@@ -0,0 +1,171 @@
+import atexit
+import queue
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from common.models.table_version import bump_version
+from models.database import db
+from models.order import Order
+from models.order_ticket import OrderTicket
+from sqlalchemy import delete, insert
+
+# Tickets are uuid4 hex strings
+TICKET_FORMAT = re.compile(r"[0-9a-f]{32}")
+
+FAILED_ERROR = "Order could not be saved"
+
+
+class OrderWriter:
+    """
+    Write-behind queue for POST /orders (group commit).
+
+    ``submit()`` only enqueues the validated order and returns a ticket id. A
+    background thread drains the queue and inserts up to ``max_batch`` orders
+    per transaction, waiting at most ``max_delay`` seconds after the first
+    queued order for others to join its batch, so one commit is paid per
+    batch instead of per order.
+
+    The outcome of each ticket is written to ``order_tickets`` in the
+    transaction of its order, or as ``failed`` when the order cannot be
+    saved, so any worker can answer a poll. Until then the ticket is only
+    known, as queued, to the worker that issued it; a ticket known to neither
+    is not found.
+    """
+
+    def __init__(self, app, max_batch, max_delay, retention):
+        self.app = app
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.retention = retention
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        # Ticket -> state of the tickets issued here whose outcome is not written yet
+        self._pending = {}
+
+    def submit(self, values):
+        """Enqueue the column values of a new order and return its ticket id."""
+        ticket = uuid.uuid4().hex
+        self._start()
+        with self._lock:
+            self._pending[ticket] = {"ticket": ticket, "status": "queued"}
+        self._queue.put((ticket, values))
+        return ticket
+
+    def ticket(self, ticket):
+        """Return the state of ``ticket``, or None when it is not a known ticket."""
+        if not TICKET_FORMAT.fullmatch(ticket):
+            return None
+        with self._lock:
+            state = self._pending.get(ticket)
+        if state is not None:
+            return dict(state)
+        row = db.session.get(OrderTicket, ticket)
+        return row.to_dict() if row is not None else None
+
+    def flush(self):
+        """Block until every order submitted so far has been written."""
+        if self._queue.unfinished_tasks:
+            self._start()
+        self._queue.join()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="order-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                with self.app.app_context():
+                    self._write(batch)
+            except Exception:
+                # Keep the thread alive for the next batches
+                self.app.logger.exception("Write-behind batch of %d orders failed", len(batch))
+                self._fail(batch)
+            else:
+                self._forget(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _fail(self, batch):
+        """Record the tickets of ``batch`` without an outcome yet as failed."""
+        failed = [{"ticket": ticket, "status": "failed", "error": FAILED_ERROR} for ticket, _ in batch]
+        try:
+            with self.app.app_context(), db.engine.begin() as connection:
+                # Orders committed before the failure keep their ticket
+                connection.execute(insert(OrderTicket).prefix_with("OR IGNORE"), failed)
+        except Exception:
+            # The database is unusable: only this worker can report the failure
+            self.app.logger.exception("Could not record %d failed order tickets", len(failed))
+            with self._lock:
+                self._pending.update((state["ticket"], state) for state in failed)
+        else:
+            self._forget(batch)
+
+    def _forget(self, batch):
+        with self._lock:
+            for ticket, _ in batch:
+                self._pending.pop(ticket, None)
+
+    def _write(self, batch):
+        """Insert ``batch`` in one transaction, or order by order if that fails."""
+        try:
+            version = self._insert(batch)
+            written = [(values, version) for _, values in batch]
+        except Exception:
+            # Isolate the orders that cannot be inserted from the rest of the batch
+            written, failed = [], []
+            for item in batch:
+                try:
+                    written.append((item[1], self._insert([item])))
+                except Exception:
+                    failed.append({"ticket": item[0], "status": "failed", "error": FAILED_ERROR})
+            if failed:
+                with db.engine.begin() as connection:
+                    connection.execute(insert(OrderTicket), failed)
+
+        counters = self.app.extensions["order_counters"]
+        for values, version in written:
+            counters.apply(None, values["status"], version)
+
+    def _insert(self, batch):
+        """
+        Insert the orders of ``batch`` and their tickets and commit; returns
+        the version of the orders table the transaction committed.
+        """
+        statement = insert(Order).returning(Order.id, sort_by_parameter_order=True)
+        with db.engine.begin() as connection:
+            ids = connection.execute(statement, [values for _, values in batch]).scalars().all()
+            connection.execute(insert(OrderTicket), [
+                {"ticket": ticket, "status": "committed", "order_id": order_id}
+                for (ticket, _), order_id in zip(batch, ids)
+            ])
+            connection.execute(delete(OrderTicket).where(
+                OrderTicket.created_at < datetime.utcnow() - timedelta(seconds=self.retention)
+            ))
+            return bump_version("orders", connection)
+
+
+def init_order_writer(app):
+    """Attach the write-behind order queue configured by ``ORDER_WRITE_BEHIND_*`` to ``app``."""
+    writer = OrderWriter(app, app.config["ORDER_WRITE_BEHIND_MAX_BATCH"],
+                         app.config["ORDER_WRITE_BEHIND_MAX_DELAY"], app.config["ORDER_TICKET_RETENTION"])
+    app.extensions["order_writer"] = writer
+    # Orders still queued when the interpreter exits are written first
+    atexit.register(writer.flush)
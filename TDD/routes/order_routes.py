@@ -1,23 +1,173 @@
-from flask import Blueprint, jsonify, request
+import base64
+import json
+
+from flask import Blueprint, Response, current_app, jsonify, request, url_for
+from common.models.table_version import bump_version
+from common.routes.conditional import conditional
+from common.serialization import encode, fragment_cache, load_fields, parse_fields, render_rows, sparse_dict
 from models.database import db
 from models.order import Order
+from sqlalchemy import delete, tuple_
+from sqlalchemy.orm.exc import ObjectDeletedError
 from datetime import datetime
 
 order_routes = Blueprint("order_routes", __name__)
 
+def _status_counters():
+    return current_app.extensions["order_counters"]
+
+# Query parameters that switch GET /orders to newest-first, paginated results
+QUERY_PARAMETERS = ("status", "since", "until", "customer", "limit", "cursor")
+
+def _datetime_arg(name):
+    raw = request.args.get(name)
+    if raw is None:
+        return None
+    try:
+        return datetime.fromisoformat(raw)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an ISO 8601 date or datetime")
+
+def _limit_arg():
+    raw = request.args.get("limit")
+    if raw is None:
+        return None
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise ValueError("'limit' must be an integer")
+    if limit < 1:
+        raise ValueError("'limit' must be >= 1")
+    return limit
+
+def _encode_cursor(order):
+    position = [order.order_date.isoformat(), order.id]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+def _decode_cursor(cursor):
+    try:
+        order_date, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(order_date), int(last_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+def _order_query():
+    """
+    Build the order query described by the request, and return it with the
+    page size.
+
+    Without any filter or paging parameter every order is returned by id.
+    Otherwise orders come newest first, keyset-paginated on (order_date, id):
+    ``status`` is served by the (status, order_date) index, ``since`` and
+    ``until`` by the order_date index and ``customer`` by the customer_name
+    index.
+    """
+    if not any(name in request.args for name in QUERY_PARAMETERS):
+        return Order.query.order_by(Order.id), None
+
+    since = _datetime_arg("since")
+    until = _datetime_arg("until")
+    limit = _limit_arg()
+    cursor = request.args.get("cursor")
+
+    query = Order.query
+    if "status" in request.args:
+        query = query.filter(Order.status == request.args["status"])
+    if "customer" in request.args:
+        query = query.filter(Order.customer_name == request.args["customer"])
+    if since is not None:
+        query = query.filter(Order.order_date >= since)
+    if until is not None:
+        query = query.filter(Order.order_date <= until)
+    if cursor:
+        query = query.filter(tuple_(Order.order_date, Order.id) < tuple_(*_decode_cursor(cursor)))
+    query = query.order_by(Order.order_date.desc(), Order.id.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query, limit
+
 @order_routes.route("/orders", methods=["GET"])
+@conditional("orders")
 def get_orders():
     """
-    Retrieve all orders
+    Retrieve orders, optionally filtered and paginated (newest first)
     ---
+    parameters:
+      - name: status
+        in: query
+        type: string
+        enum: [pending, processing, shipped, delivered, cancelled]
+        required: false
+      - name: since
+        in: query
+        type: string
+        format: date-time
+        required: false
+        description: Only orders placed at or after this date
+      - name: until
+        in: query
+        type: string
+        format: date-time
+        required: false
+        description: Only orders placed at or before this date
+      - name: customer
+        in: query
+        type: string
+        required: false
+        description: Exact customer name
+      - name: limit
+        in: query
+        type: integer
+        required: false
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: Value of the X-Next-Cursor header of the previous page
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated fields to return (id is always included)
     responses:
       200:
-        description: A list of orders
+        description: A list of orders; X-Next-Cursor is set when another page may follow
+      400:
+        description: Invalid filter, paging or fields parameter
     """
-    orders = Order.query.all()
-    return jsonify([order.to_dict() for order in orders]), 200
+    try:
+        fields = parse_fields(Order, request.args.get("fields"))
+        query, limit = _order_query()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if fields is not None:
+        # order_date is loaded too: the cursor is built from it
+        rows = load_fields(query, fields, Order.order_date).all()
+        body = encode([sparse_dict(order, fields) for order in rows])
+    else:
+        # Only the keys are selected here; rows are rendered from the fragment cache
+        rows = query.with_entities(Order.id, Order.version, Order.order_date).all()
+        body = render_rows(Order, rows, fragment_cache(current_app, "orders"))
+
+    response = Response(body, mimetype="application/json")
+    if limit is not None and len(rows) == limit:
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1])
+    return response, 200
+
+@order_routes.route("/orders/status-counts", methods=["GET"])
+def get_order_status_counts():
+    """
+    Number of orders per status
+    ---
+    responses:
+      200:
+        description: Order count for every status, served from in-memory counters
+    """
+    return jsonify(_status_counters().counts()), 200
 
 @order_routes.route("/orders/<int:order_id>", methods=["GET"])
+@conditional("orders")
 def get_order(order_id):
     """
     Retrieve an order by ID
@@ -28,12 +178,30 @@ def get_order(order_id):
         type: integer
         required: true
         description: ID of the order to retrieve
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated fields to return (id is always included)
     responses:
       200:
         description: Order details
+      400:
+        description: Unknown field requested
       404:
         description: Order not found
     """
+    try:
+        fields = parse_fields(Order, request.args.get("fields"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if fields is not None:
+        order = load_fields(Order.query.filter_by(id=order_id), fields).first()
+        if order:
+            return jsonify(sparse_dict(order, fields)), 200
+        return jsonify({"error": "Order not found"}), 404
+
     order = Order.query.get(order_id)
     if order:
         return jsonify(order.to_dict()), 200
@@ -64,6 +232,8 @@ def create_order():
     responses:
       201:
         description: Order created successfully
+      202:
+        description: Order queued (ORDER_WRITE_BEHIND_ENABLED); poll the returned ticket
       400:
         description: Invalid input
     """
@@ -76,20 +246,53 @@ def create_order():
     if not data.get("total_amount") and data.get("total_amount") != 0:
         return jsonify({"error": "Total amount is required"}), 400
     
+    values = {
+        "customer_name": data["customer_name"],
+        "order_date": datetime.utcnow(),
+        "total_amount": float(data["total_amount"]),
+        "status": data.get("status", "pending")
+    }
+
+    # Write-behind mode: the order is inserted later, with others, in one transaction
+    if current_app.config["ORDER_WRITE_BEHIND_ENABLED"]:
+        ticket = current_app.extensions["order_writer"].submit(values)
+        response = jsonify({"ticket": ticket, "status": "queued"})
+        response.headers["Location"] = url_for("order_routes.get_order_ticket", ticket=ticket)
+        return response, 202
+
     # Create new order
-    new_order = Order(
-        customer_name=data["customer_name"],
-        order_date=datetime.utcnow(),
-        total_amount=float(data["total_amount"]),
-        status=data.get("status", "pending")
-    )
+    new_order = Order(**values)
     
     # Save to database
     db.session.add(new_order)
+    version = bump_version("orders")
     db.session.commit()
-    
+
+    _status_counters().apply(None, new_order.status, version)
     return jsonify(new_order.to_dict()), 201
 
+@order_routes.route("/orders/tickets/<ticket>", methods=["GET"])
+def get_order_ticket(ticket):
+    """
+    State of an order queued in write-behind mode
+    ---
+    parameters:
+      - name: ticket
+        in: path
+        type: string
+        required: true
+        description: Ticket returned by POST /orders with a 202
+    responses:
+      200:
+        description: Ticket status (queued, committed with order_id, or failed with error)
+      404:
+        description: Ticket not found
+    """
+    state = current_app.extensions["order_writer"].ticket(ticket)
+    if state is None:
+        return jsonify({"error": "Ticket not found"}), 404
+    return jsonify(state), 200
+
 @order_routes.route("/orders/<int:order_id>", methods=["PUT"])
 def update_order(order_id):
     """
@@ -127,6 +330,16 @@ def update_order(order_id):
         return jsonify({"error": "Order not found"}), 404
 
     data = request.get_json()
+
+    # The version bump takes the database write lock: no other request can
+    # change the status between the read below and the commit
+    version = bump_version("orders")
+    try:
+        db.session.refresh(order, ["status"])
+    except ObjectDeletedError:
+        db.session.rollback()
+        return jsonify({"error": "Order not found"}), 404
+    old_status = order.status
     
     # Update order fields if provided
     if "customer_name" in data:
@@ -138,7 +351,8 @@ def update_order(order_id):
     
     # Save to database
     db.session.commit()
-    
+
+    _status_counters().apply(old_status, order.status, version)
     return jsonify(order.to_dict()), 200
 
 @order_routes.route("/orders/<int:order_id>", methods=["DELETE"])
@@ -158,12 +372,16 @@ def delete_order(order_id):
       404:
         description: Order not found
     """
-    order = Order.query.get(order_id)
-    if not order:
+    # Delete from database, getting the status of the row actually deleted
+    status = db.session.execute(delete(Order).where(Order.id == order_id).returning(Order.status)).scalar()
+    if status is None:
+        db.session.rollback()
         return jsonify({"error": "Order not found"}), 404
-
-    # Delete from database
-    db.session.delete(order)
+    version = bump_version("orders")
     db.session.commit()
-    
+
+    _status_counters().apply(status, None, version)
+    cache = fragment_cache(current_app, "orders")
+    if cache is not None:
+        cache.invalidate(order_id)
     return jsonify({"message": "Order deleted successfully"}), 200
\ No newline at end of file
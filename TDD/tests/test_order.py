@@ -1,7 +1,14 @@
+import time
 import unittest
+from unittest import mock
 from app import create_app
+from common.models.table_version import bump_version
+from common.profiler import init_query_profiler
 from models.database import db
 from models.order import Order
+from order_counters import StatusCounters
+from routes.order_routes import _order_query
+from sqlalchemy import text
 from datetime import datetime
 
 class OrderTestCase(unittest.TestCase):
@@ -213,5 +220,271 @@ class OrderTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 404)
         self.assertIn("error", response.json)
 
+    def test_orders_etag(self):
+        """Test conditional GET on the order list"""
+        etag = self.client.get("/api/orders").headers["ETag"]
+        response = self.client.get("/api/orders", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+        self.client.post("/api/orders", json={"customer_name": "New Customer", "total_amount": 10})
+        response = self.client.get("/api/orders", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json), 1)
+
+    def test_get_orders_sparse_fields(self):
+        """Test that fields= restricts the order list and detail payloads"""
+        with self.app.app_context():
+            db.session.add(Order(customer_name="John Doe", order_date=datetime(2025, 2, 1),
+                                 total_amount=99.99, status="completed"))
+            db.session.commit()
+
+        response = self.client.get("/api/orders?fields=status,order_date")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, [{"id": 1, "status": "completed", "order_date": "2025-02-01T00:00:00"}])
+
+        response = self.client.get("/api/orders/1?fields=customer_name")
+        self.assertEqual(response.json, {"id": 1, "customer_name": "John Doe"})
+
+        response = self.client.get("/api/orders?fields=customer_email")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("customer_email", response.json["error"])
+
+    def _add_orders(self):
+        with self.app.app_context():
+            for day, customer, status in ((1, "John Doe", "pending"), (3, "Jane Smith", "shipped"),
+                                          (5, "John Doe", "pending"), (7, "Jane Smith", "pending"),
+                                          (9, "John Doe", "cancelled")):
+                db.session.add(Order(customer_name=customer, order_date=datetime(2025, 3, day),
+                                     total_amount=10.0, status=status))
+            db.session.commit()
+
+    def test_order_status_counts(self):
+        """Test that the status counters follow creates, updates and deletes"""
+        self._add_orders()
+        counters = self.app.extensions["order_counters"]
+        with self.app.app_context():
+            counters.reconcile()
+
+        response = self.client.get("/api/orders/status-counts")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {"pending": 3, "processing": 0, "shipped": 1,
+                                         "delivered": 0, "cancelled": 1})
+
+        self.client.post("/api/orders", json={"customer_name": "New Customer", "total_amount": 10})
+        self.client.put("/api/orders/2", json={"status": "delivered"})
+        self.client.put("/api/orders/1", json={"total_amount": 20})
+        self.client.delete("/api/orders/5")
+        response = self.client.get("/api/orders/status-counts")
+        self.assertEqual(response.json, {"pending": 4, "processing": 0, "shipped": 0,
+                                         "delivered": 1, "cancelled": 0})
+
+    def test_order_status_counts_reconcile(self):
+        """Test that drift from writes made outside the API is corrected by reconciliation"""
+        self.client.get("/api/orders/status-counts")
+        self._add_orders()
+        counters = self.app.extensions["order_counters"]
+
+        self.assertEqual(self.client.get("/api/orders/status-counts").json["pending"], 0)
+        with self.app.app_context():
+            counters.reconcile()
+        self.assertEqual(self.client.get("/api/orders/status-counts").json["pending"], 3)
+
+    def test_order_status_counts_reconciled_periodically(self):
+        """Test that the counters are recounted in the background"""
+        counters = StatusCounters(self.app, reconcile_interval=0.01)
+        self.assertEqual(counters.counts()["pending"], 0)
+        self._add_orders()
+        deadline = time.monotonic() + 5
+        while counters.counts()["pending"] != 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(counters.counts()["pending"], 3)
+        # Let the thread go back to sleep before tearDown drops the tables
+        counters.reconcile_interval = 3600
+        time.sleep(0.05)
+
+    def test_order_status_counts_race_with_reconcile(self):
+        """Test that a transition is counted once, whether or not the recount saw it"""
+        self.client.post("/api/orders", json={"customer_name": "John Doe", "total_amount": 10})
+        counters = self.app.extensions["order_counters"]
+        with self.app.app_context():
+            counters.reconcile()
+
+        # Committed before the recount but applied after it: already counted
+        counters.apply(None, "pending", 1)
+        # Applied before a recount whose snapshot predates its commit: kept
+        counters.apply("pending", "shipped", 2)
+        with self.app.app_context():
+            counters.reconcile()
+        self.assertEqual(counters.counts(), {"pending": 0, "processing": 0, "shipped": 1,
+                                             "delivered": 0, "cancelled": 0})
+
+    def test_order_status_counts_concurrent_update(self):
+        """Test that an update counts the status it replaced, not the one it first read"""
+        self.client.post("/api/orders", json={"customer_name": "John Doe", "total_amount": 10})
+        counters = self.app.extensions["order_counters"]
+
+        def bump_after_concurrent_update(name, connection=None):
+            # Another request ships the order after this one read it as pending
+            with db.engine.begin() as other:
+                other.execute(text("UPDATE orders SET status = 'shipped' WHERE id = 1"))
+                version = bump_version("orders", other)
+            counters.apply("pending", "shipped", version)
+            return bump_version(name, connection)
+
+        with mock.patch("routes.order_routes.bump_version", bump_after_concurrent_update):
+            response = self.client.put("/api/orders/1", json={"status": "delivered"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get("/api/orders/status-counts").json,
+                         {"pending": 0, "processing": 0, "shipped": 0, "delivered": 1, "cancelled": 0})
+
+    def test_create_orders_write_behind(self):
+        """Test that queued orders are written in batches and their tickets can be polled"""
+        self.app.config["ORDER_WRITE_BEHIND_ENABLED"] = True
+        writer = self.app.extensions["order_writer"]
+
+        tickets = []
+        for i in range(5):
+            response = self.client.post("/api/orders", json={"customer_name": f"Customer {i}", "total_amount": i})
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(response.json["status"], "queued")
+            self.assertTrue(response.headers["Location"].endswith(response.json["ticket"]))
+            tickets.append(response.json["ticket"])
+        writer.flush()
+
+        order_ids = []
+        for ticket in tickets:
+            response = self.client.get(f"/api/orders/tickets/{ticket}")
+            self.assertEqual(response.json["status"], "committed")
+            order_ids.append(response.json["order_id"])
+        names = [self.client.get(f"/api/orders/{order_id}").json["customer_name"] for order_id in order_ids]
+        self.assertEqual(names, [f"Customer {i}" for i in range(5)])
+        self.assertEqual(self.client.get("/api/orders/status-counts").json["pending"], 5)
+
+        self.assertEqual(self.client.get("/api/orders/tickets/unknown").status_code, 404)
+        response = self.client.post("/api/orders", json={"total_amount": 10})
+        self.assertEqual(response.status_code, 400)
+
+    def test_order_tickets_shared_between_workers(self):
+        """Test that a ticket can be polled on a worker other than the one that issued it"""
+        self.app.config["ORDER_WRITE_BEHIND_ENABLED"] = True
+        ticket = self.client.post("/api/orders", json={"customer_name": "Shared", "total_amount": 1}).json["ticket"]
+        self.app.extensions["order_writer"].flush()
+
+        other = create_app().test_client()
+        response = other.get(f"/api/orders/tickets/{ticket}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["status"], "committed")
+        self.assertEqual(other.get(f"/api/orders/{response.json['order_id']}").json["customer_name"], "Shared")
+        # Never issued, or purged after ORDER_TICKET_RETENTION
+        self.assertEqual(other.get(f"/api/orders/tickets/{'0' * 32}").status_code, 404)
+
+    def test_order_writer_survives_failed_batch(self):
+        """Test that the tickets of a batch failing outside the per-order fallback are failed, and the writer goes on"""
+        self.app.config["ORDER_WRITE_BEHIND_ENABLED"] = True
+        writer = self.app.extensions["order_writer"]
+        with mock.patch.object(writer, "_write", side_effect=RuntimeError("disk I/O error")), \
+                self.assertLogs(self.app.logger, "ERROR"):
+            lost = self.client.post("/api/orders", json={"customer_name": "Lost", "total_amount": 1}).json["ticket"]
+            writer.flush()
+        response = create_app().test_client().get(f"/api/orders/tickets/{lost}")
+        self.assertEqual(response.json, {"ticket": lost, "status": "failed", "error": "Order could not be saved"})
+
+        # Nor can the failure be recorded: the issuing worker still reports it
+        with mock.patch.object(writer, "_write", side_effect=RuntimeError("disk I/O error")), \
+                mock.patch("order_queue.insert", side_effect=RuntimeError("disk I/O error")), \
+                self.assertLogs(self.app.logger, "ERROR"):
+            lost = self.client.post("/api/orders", json={"customer_name": "Lost", "total_amount": 1}).json["ticket"]
+            writer.flush()
+        self.assertEqual(self.client.get(f"/api/orders/tickets/{lost}").json["status"], "failed")
+
+        ticket = self.client.post("/api/orders", json={"customer_name": "Saved", "total_amount": 1}).json["ticket"]
+        writer.flush()
+        self.assertEqual(self.client.get(f"/api/orders/tickets/{ticket}").json["status"], "committed")
+
+    def test_get_orders_filtered(self):
+        """Test status, date range and customer filters, newest first"""
+        self._add_orders()
+
+        response = self.client.get("/api/orders?status=pending")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([o["id"] for o in response.json], [4, 3, 1])
+
+        response = self.client.get("/api/orders?since=2025-03-03&until=2025-03-07T00:00:00")
+        self.assertEqual([o["id"] for o in response.json], [4, 3, 2])
+
+        response = self.client.get("/api/orders?customer=John%20Doe&status=pending")
+        self.assertEqual([o["id"] for o in response.json], [3, 1])
+
+    def test_get_orders_keyset_pagination(self):
+        """Test paging newest first with limit and X-Next-Cursor"""
+        self._add_orders()
+
+        ids, url = [], "/api/orders?limit=2"
+        while url:
+            response = self.client.get(url)
+            ids.extend(o["id"] for o in response.json)
+            cursor = response.headers.get("X-Next-Cursor")
+            url = f"/api/orders?limit=2&cursor={cursor}" if cursor else None
+        self.assertEqual(ids, [5, 4, 3, 2, 1])
+
+        response = self.client.get("/api/orders?status=pending&limit=2&fields=status")
+        self.assertEqual(response.json, [{"id": 4, "status": "pending"}, {"id": 3, "status": "pending"}])
+        cursor = response.headers["X-Next-Cursor"]
+        response = self.client.get(f"/api/orders?status=pending&limit=2&cursor={cursor}")
+        self.assertEqual([o["id"] for o in response.json], [1])
+        self.assertNotIn("X-Next-Cursor", response.headers)
+
+    def test_get_orders_invalid_parameters(self):
+        """Test that invalid filter or paging parameters are rejected"""
+        for query in ("since=yesterday", "until=2025-13-01", "limit=0", "limit=ten", "cursor=%%%"):
+            response = self.client.get(f"/api/orders?{query}")
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn("error", response.json)
+
+    def test_order_filters_use_indexes(self):
+        """Test that every filter combination is served by an index"""
+        queries = (
+            ("status=pending", "ix_orders_status_order_date"),
+            ("status=pending&since=2025-01-01&until=2025-02-01", "ix_orders_status_order_date"),
+            ("since=2025-01-01", "ix_orders_order_date"),
+            ("customer=Jane", "ix_orders_customer_name"),
+        )
+        for query, index in queries:
+            with self.app.test_request_context(f"/api/orders?{query}&limit=50"):
+                statement = _order_query()[0].statement.compile(
+                    db.engine, compile_kwargs={"literal_binds": True}
+                )
+                plan = db.session.execute(text(f"EXPLAIN QUERY PLAN {statement}")).fetchall()
+            details = " ".join(row[-1] for row in plan)
+            self.assertIn(f"SEARCH orders USING INDEX {index}", details, query)
+
+    def test_order_metrics(self):
+        """Test that /metrics reports order requests by route template"""
+        # Requests are recorded when their response is closed, as WSGI servers do
+        self.client.post("/api/orders", json={"customer_name": "Metrics", "total_amount": 10}, buffered=True)
+        self.client.get("/api/orders/1", buffered=True)
+        self.client.get("/api/orders/999", buffered=True)
+
+        body = self.client.get("/metrics").get_data(as_text=True)
+        route = 'route="/api/orders/<int:order_id>",method="GET"'
+        self.assertIn(f'http_requests_total{{{route},status="200"}} 1', body)
+        self.assertIn(f'http_requests_total{{{route},status="404"}} 1', body)
+        self.assertIn(f"http_request_duration_seconds_count{{{route}}} 2", body)
+        self.assertIn('db_statements_total{route="/api/orders",method="POST"}', body)
+
+    def test_slow_query_log_flags_order_scans(self):
+        """Test that the slow-query log calls out full scans of orders only"""
+        self.app.config.update(SLOW_QUERY_LOG_ENABLED=True, SLOW_QUERY_THRESHOLD=0)
+        init_query_profiler(self.app)
+        with self.assertLogs(self.app.logger, "WARNING") as logs:
+            self.client.get("/api/orders?status=pending&limit=10")
+        output = "\n".join(logs.output)
+        self.assertIn("USING INDEX ix_orders_status_order_date", output)
+        self.assertNotIn("full scan of orders", output)
+
+        with self.assertLogs(self.app.logger, "WARNING") as logs:
+            self.client.get("/api/orders")
+        self.assertIn("in GET /api/orders: full scan of orders", "\n".join(logs.output))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
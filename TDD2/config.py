@@ -2,3 +2,36 @@ class Config:
     SQLALCHEMY_DATABASE_URI = "sqlite:///users.db"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     DEBUG = True
+    # Engine profile applied by common/models/engine.py: pragmas run on every new
+    # connection, pool settings (database files only)
+    SQLITE_PRAGMAS = {
+        "busy_timeout": 5000,  # ms to wait for a lock before "database is locked"
+        "journal_mode": "WAL",  # readers no longer block behind the writer
+        "synchronous": "NORMAL",  # durable with WAL; fsync at checkpoints only
+        "mmap_size": 256 * 1024 * 1024,  # bytes
+        "cache_size": -64000,  # negative: KiB, so 64 MB of page cache
+        "temp_store": "MEMORY",
+    }
+    SQLITE_POOL_SIZE = 10
+    SQLITE_MAX_OVERFLOW = 20
+    SQLITE_POOL_TIMEOUT = 30  # seconds to wait for a pooled connection
+    # Prometheus metrics served at /metrics (see common/metrics.py)
+    METRICS_ENABLED = True
+    # Log SQL statements slower than SLOW_QUERY_THRESHOLD with their query plan
+    # (see common/profiler.py)
+    SLOW_QUERY_LOG_ENABLED = False
+    SLOW_QUERY_THRESHOLD = 0.1  # seconds
+    # Tables whose full scans are called out
+    SLOW_QUERY_SCAN_TABLES = ("products", "orders", "users", "factures")
+    # In-process cache of GET /api/users/<id> payloads (see common/cache.py)
+    USER_CACHE_ENABLED = True
+    USER_CACHE_SIZE = 10000
+    USER_CACHE_TTL = 30  # seconds
+    # Encoded JSON of list rows, reused while the row version is unchanged
+    # (see common/serialization.py)
+    FRAGMENT_CACHE_ENABLED = True
+    FRAGMENT_CACHE_SIZE = 100000
+    # Serve plain GET /api/products and /api/products/<id> from an in-memory
+    # snapshot of the catalog, rebuilt when the database file changes
+    PRODUCT_SNAPSHOT_ENABLED = False
+    PRODUCT_SNAPSHOT_CHECK_INTERVAL = 1.0  # seconds between database file checks
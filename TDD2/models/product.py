@@ -1,12 +1,18 @@
 from models.database import db
+from sqlalchemy import literal_column
 
 class Product(db.Model):
     __tablename__ = "products"
+    # Ids of deleted products are never reused: they key cached JSON fragments
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)
     description = db.Column(db.Text)
-    price = db.Column(db.Float, nullable=False)
+    price = db.Column(db.Float, nullable=False, index=True)
+    # Incremented by every UPDATE; keys the cached JSON fragment of the row
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1",
+                        onupdate=literal_column("version + 1"))
 
     def to_dict(self):
         return {
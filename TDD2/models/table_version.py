@@ -0,0 +1,5 @@
+from common.models.table_version import TableVersionMixin
+from models.database import db
+
+class TableVersion(TableVersionMixin, db.Model):
+    pass
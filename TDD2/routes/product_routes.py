@@ -1,22 +1,188 @@
-from flask import Blueprint, jsonify
+import base64
+import json
+import sys
+
+from flask import Blueprint, Response, current_app, jsonify, request
+from common.routes.conditional import conditional
+from common.serialization import encode, fragment_cache, load_fields, parse_fields, render_rows, sparse_dict
 from models.database import db
 from models.product import Product
+from sqlalchemy import tuple_
 
 product_routes = Blueprint("product_routes", __name__)
 
+# Sort keys accepted by GET /products ("-" prefix for descending order)
+SORT_COLUMNS = {"id": Product.id, "name": Product.name, "price": Product.price}
+
+def _number_arg(name, cast, minimum=None):
+    """Read a numeric query parameter, or None when it is absent."""
+    raw = request.args.get(name)
+    if raw is None:
+        return None
+    try:
+        value = cast(raw)
+    except ValueError:
+        raise ValueError(f"'{name}' must be a number")
+    if minimum is not None and value < minimum:
+        raise ValueError(f"'{name}' must be >= {minimum}")
+    return value
+
+def _prefix_upper_bound(prefix):
+    """Smallest string greater than every string starting with ``prefix``."""
+    last = ord(prefix[-1])
+    if last == sys.maxunicode:
+        return None
+    return prefix[:-1] + chr(last + 1)
+
+def _encode_cursor(sort, product):
+    key = getattr(product, sort.lstrip("-"))
+    return base64.urlsafe_b64encode(json.dumps([sort, key, product.id]).encode()).decode()
+
+def _decode_cursor(cursor, sort):
+    try:
+        cursor_sort, key, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort:
+        raise ValueError("cursor was issued for another sort order")
+    return key, last_id
+
+def _product_query():
+    """
+    Build the product query described by the filter, sort and paging
+    parameters of the request, and return it with the sort key and limit.
+
+    ``name_prefix`` is turned into a range on ``name`` and the price bounds
+    into a range on ``price`` so that both are served by their indexes.
+    Paging is either ``offset`` or keyset (``cursor``) on (sort key, id).
+    """
+    min_price = _number_arg("min_price", float)
+    max_price = _number_arg("max_price", float)
+    name_prefix = request.args.get("name_prefix")
+    sort = request.args.get("sort", "id")
+    limit = _number_arg("limit", int, minimum=1)
+    offset = _number_arg("offset", int, minimum=0)
+    cursor = request.args.get("cursor")
+
+    if sort.lstrip("-") not in SORT_COLUMNS:
+        raise ValueError(f"'sort' must be one of: {', '.join(SORT_COLUMNS)} (prefix with - for descending)")
+    if cursor and offset:
+        raise ValueError("Use either offset or cursor, not both")
+
+    query = Product.query
+    if min_price is not None:
+        query = query.filter(Product.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Product.price <= max_price)
+    if name_prefix:
+        query = query.filter(Product.name >= name_prefix)
+        upper_bound = _prefix_upper_bound(name_prefix)
+        if upper_bound is not None:
+            query = query.filter(Product.name < upper_bound)
+
+    descending = sort.startswith("-")
+    column = SORT_COLUMNS[sort.lstrip("-")]
+    sort_key = Product.id if column is Product.id else tuple_(column, Product.id)
+    if cursor:
+        key, last_id = _decode_cursor(cursor, sort)
+        position = last_id if column is Product.id else tuple_(key, last_id)
+        query = query.filter(sort_key < position if descending else sort_key > position)
+    if column is Product.id:
+        order = [Product.id.desc() if descending else Product.id]
+    else:
+        order = [column.desc(), Product.id.desc()] if descending else [column, Product.id]
+    query = query.order_by(*order)
+
+    if offset:
+        query = query.offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
+    return query, sort, limit
+
+def _product_page():
+    """
+    Run the request's product query. Returns the encoded JSON array of the
+    products (restricted to the ``fields`` parameter when given) and the
+    cursor of the next page, or None when the page is the last one.
+    """
+    fields = parse_fields(Product, request.args.get("fields"))
+    query, sort, limit = _product_query()
+    if fields is not None:
+        # The sort column is loaded too: the cursor is built from it
+        rows = load_fields(query, fields, SORT_COLUMNS[sort.lstrip("-")]).all()
+        body = encode([sparse_dict(product, fields) for product in rows])
+    else:
+        # Only the keys are selected here; rows are rendered from the fragment cache
+        rows = query.with_entities(Product.id, Product.version, Product.name, Product.price).all()
+        body = render_rows(Product, rows, fragment_cache(current_app, "products"))
+
+    next_cursor = None
+    if limit is not None and len(rows) == limit:
+        next_cursor = _encode_cursor(sort, rows[-1])
+    return body, next_cursor
+
 @product_routes.route("/products", methods=["GET"])
+@conditional("products")
 def get_products():
     """
-    Retrieve all products
+    Retrieve products, optionally filtered, sorted and paginated
     ---
+    parameters:
+      - name: min_price
+        in: query
+        type: number
+        required: false
+      - name: max_price
+        in: query
+        type: number
+        required: false
+      - name: name_prefix
+        in: query
+        type: string
+        required: false
+        description: Only products whose name starts with this prefix (case-sensitive)
+      - name: sort
+        in: query
+        type: string
+        enum: [id, -id, name, -name, price, -price]
+        required: false
+        description: Sort key, "-" for descending (id by default)
+      - name: limit
+        in: query
+        type: integer
+        required: false
+      - name: offset
+        in: query
+        type: integer
+        required: false
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: Value of the X-Next-Cursor header of the previous page
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated fields to return (id is always included)
     responses:
       200:
-        description: A list of products
+        description: A list of products; X-Next-Cursor is set when another page may follow
+      400:
+        description: Invalid filter, sort, paging or fields parameter
     """
-    products = Product.query.all()
-    return jsonify([product.to_dict() for product in products]), 200
+    try:
+        body, next_cursor = _product_page()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    response = Response(body, mimetype="application/json")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response, 200
 
 @product_routes.route("/products/<int:product_id>", methods=["GET"])
+@conditional("products")
 def get_product(product_id):
     """
     Retrieve a product by ID
@@ -27,12 +193,30 @@ def get_product(product_id):
         type: integer
         required: true
         description: ID of the product to retrieve
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated fields to return (id is always included)
     responses:
       200:
         description: Product details
+      400:
+        description: Unknown field requested
       404:
         description: Product not found
     """
+    try:
+        fields = parse_fields(Product, request.args.get("fields"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if fields is not None:
+        product = load_fields(Product.query.filter_by(id=product_id), fields).first()
+        if product:
+            return jsonify(sparse_dict(product, fields)), 200
+        return jsonify({"error": "Product not found"}), 404
+
     product = Product.query.get(product_id)
     if product:
         return jsonify(product.to_dict()), 200
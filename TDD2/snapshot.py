@@ -0,0 +1,156 @@
+import hashlib
+import os
+import threading
+import time
+
+from flask import current_app
+from models.database import db
+from models.product import Product
+
+
+class CatalogSnapshot:
+    """
+    Immutable in-memory copy of the products table, pre-encoded as JSON.
+
+    ``items`` is indexed by product id (None for unused ids) and holds the
+    encoded body of GET /products/<id>; ``list_body`` is the encoded body of
+    GET /products. ``signature`` identifies the database file state the
+    snapshot was built from.
+    """
+    __slots__ = ("items", "list_body", "etag", "signature")
+
+    def __init__(self, products, signature):
+        dumps = current_app.json.dumps
+        bodies = [(product.id, dumps(product.to_dict()).encode()) for product in products]
+        items = [None] * (max((product_id for product_id, _ in bodies), default=0) + 1)
+        for product_id, body in bodies:
+            items[product_id] = body
+
+        self.items = tuple(items)
+        self.list_body = b"[" + b",".join(body for _, body in bodies) + b"]"
+        self.etag = hashlib.blake2b(self.list_body, digest_size=8).hexdigest()
+        self.signature = signature
+
+    def item(self, product_id):
+        if 0 <= product_id < len(self.items):
+            return self.items[product_id]
+        return None
+
+
+class SnapshotStore:
+    """
+    Holds the current CatalogSnapshot and swaps in a rebuilt one when the
+    database file changes.
+
+    The file is stat'ed at most every ``check_interval`` seconds. A rebuild
+    runs in the request that noticed the change while concurrent requests
+    keep serving the previous snapshot; the swap is a single reference
+    assignment, so readers never see a half-built catalog.
+    """
+
+    def __init__(self, check_interval):
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def is_fresh(self):
+        """True while the current snapshot can be served without checking the file."""
+        return self._snapshot is not None and time.monotonic() < self._next_check
+
+    def get(self):
+        """
+        Return the current snapshot, rebuilding it first if the database file
+        changed. Needs an app context unless ``is_fresh()``.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() < self._next_check:
+            return snapshot
+        if not self._lock.acquire(blocking=snapshot is None):
+            return snapshot
+        try:
+            self._next_check = time.monotonic() + self.check_interval
+            signature = _database_signature()
+            if self._snapshot is None or signature != self._snapshot.signature:
+                self._snapshot = CatalogSnapshot(Product.query.order_by(Product.id).all(), signature)
+            return self._snapshot
+        finally:
+            self._lock.release()
+
+
+def _database_signature():
+    """Size and modification time of the SQLite file and its WAL, if any."""
+    path = db.engine.url.database
+    signature = []
+    for name in (path, f"{path}-wal") if path and path != ":memory:" else ():
+        try:
+            stat = os.stat(name)
+        except FileNotFoundError:
+            continue
+        signature.append((stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+
+class SnapshotMiddleware:
+    """
+    WSGI middleware answering plain catalog GETs from the snapshot.
+
+    ``GET /api/products`` and ``GET /api/products/<id>`` without a query
+    string are answered before Flask builds a request context: no session,
+    view, ``to_dict()`` or ``jsonify``. Anything else, including filtered or
+    paginated requests, goes to the Flask app.
+    """
+
+    def __init__(self, wsgi_app, app):
+        self.wsgi_app = wsgi_app
+        self.app = app
+        self.store = SnapshotStore(app.config["PRODUCT_SNAPSHOT_CHECK_INTERVAL"])
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        if (not path.startswith(PRODUCTS_PATH) or environ.get("QUERY_STRING")
+                or environ["REQUEST_METHOD"] != "GET" or not self.app.config["PRODUCT_SNAPSHOT_ENABLED"]):
+            return self.wsgi_app(environ, start_response)
+
+        rest = path[len(PRODUCTS_PATH):]
+        if rest and not (rest[0] == "/" and rest[1:].isdigit()):
+            return self.wsgi_app(environ, start_response)
+
+        snapshot = self.store.get() if self.store.is_fresh() else self._refresh()
+        if not rest:
+            return _respond(environ, start_response, snapshot.list_body, snapshot.etag)
+
+        product_id = int(rest[1:])
+        body = snapshot.item(product_id)
+        if body is None:
+            start_response("404 NOT FOUND", [("Content-Type", "application/json")])
+            return [NOT_FOUND_BODY]
+        return _respond(environ, start_response, body, f"{snapshot.etag}-{product_id}")
+
+    def _refresh(self):
+        with self.app.app_context():
+            return self.store.get()
+
+
+PRODUCTS_PATH = "/api/products"
+
+NOT_FOUND_BODY = b'{"error": "Product not found"}'
+
+
+def _respond(environ, start_response, body, etag):
+    etag = f'"{etag}"'
+    if_none_match = environ.get("HTTP_IF_NONE_MATCH")
+    if if_none_match and (if_none_match == "*" or etag in if_none_match):
+        start_response("304 NOT MODIFIED", [("ETag", etag)])
+        return []
+    start_response("200 OK", [
+        ("Content-Type", "application/json"),
+        ("Content-Length", str(len(body))),
+        ("ETag", etag),
+    ])
+    return [body]
+
+
+def init_product_snapshot(app):
+    """Wrap ``app`` so the catalog is served from memory while PRODUCT_SNAPSHOT_ENABLED is set."""
+    app.wsgi_app = SnapshotMiddleware(app.wsgi_app, app)
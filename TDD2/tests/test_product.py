@@ -2,6 +2,8 @@ import unittest
 from app import create_app
 from models.database import db
 from models.product import Product
+from routes.product_routes import _product_query
+from sqlalchemy import event, text
 
 class ProductTestCase(unittest.TestCase):
     def setUp(self):
@@ -67,5 +69,121 @@ class ProductTestCase(unittest.TestCase):
         self.assertIn("error", response.json)
         self.assertEqual(response.json["error"], "Product not found")
 
+    def _add_catalog(self):
+        with self.app.app_context():
+            for name, price in (("Apple", 3.0), ("Apricot", 5.0), ("Avocado", 2.0),
+                                ("Banana", 1.0), ("Blueberry", 8.0), ("Cherry", 5.0)):
+                db.session.add(Product(name=name, description="Fruit", price=price))
+            db.session.commit()
+
+    def test_get_products_filtered_and_sorted(self):
+        """Test price range, name prefix and sort parameters"""
+        self._add_catalog()
+
+        response = self.client.get("/api/products?min_price=2&max_price=5&sort=-price")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p["name"] for p in response.json], ["Cherry", "Apricot", "Apple", "Avocado"])
+
+        response = self.client.get("/api/products?name_prefix=Ap&sort=name")
+        self.assertEqual([p["name"] for p in response.json], ["Apple", "Apricot"])
+
+    def test_get_products_cursor_pagination(self):
+        """Test keyset paging through the catalog sorted by price"""
+        self._add_catalog()
+
+        names, url = [], "/api/products?sort=price&limit=4"
+        while url:
+            response = self.client.get(url)
+            names.extend(p["name"] for p in response.json)
+            cursor = response.headers.get("X-Next-Cursor")
+            url = f"/api/products?sort=price&limit=4&cursor={cursor}" if cursor else None
+        self.assertEqual(names, ["Banana", "Avocado", "Apple", "Apricot", "Cherry", "Blueberry"])
+
+        response = self.client.get("/api/products?sort=-name&limit=2&offset=2")
+        self.assertEqual([p["name"] for p in response.json], ["Banana", "Avocado"])
+
+    def test_get_products_invalid_parameters(self):
+        """Test that invalid filter, sort or paging parameters are rejected"""
+        cursor = self.client.get("/api/products?sort=price&limit=1").headers.get("X-Next-Cursor", "abc")
+        for query in ("min_price=cheap", "sort=description", "limit=0", "cursor=%%%",
+                      f"sort=name&cursor={cursor}", f"offset=2&cursor={cursor}"):
+            response = self.client.get(f"/api/products?{query}")
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn("error", response.json)
+
+    def test_get_products_sparse_fields(self):
+        """Test that fields= restricts the payload and the SELECT to the requested columns"""
+        self._add_catalog()
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with self.app.app_context():
+            event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            response = self.client.get("/api/products?fields=name,price&sort=price&limit=2")
+        finally:
+            with self.app.app_context():
+                event.remove(db.engine, "before_cursor_execute", record)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, [{"id": 4, "name": "Banana", "price": 1.0},
+                                         {"id": 3, "name": "Avocado", "price": 2.0}])
+        self.assertIn("X-Next-Cursor", response.headers)
+        self.assertFalse(any("description" in statement for statement in statements))
+
+        response = self.client.get("/api/products/1?fields=name")
+        self.assertEqual(response.json, {"id": 1, "name": "Apple"})
+
+        for url in ("/api/products?fields=name,weight", "/api/products/1?fields=version", "/api/products?fields=,"):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn("error", response.json)
+
+    def test_product_filters_use_indexes(self):
+        """Test that supported filter combinations never fall back to a table scan"""
+        queries = (
+            "min_price=1&max_price=5",
+            "name_prefix=Ap",
+            "name_prefix=Ap&min_price=1&sort=price",
+            "max_price=10&sort=-name",
+        )
+        for query in queries:
+            with self.app.test_request_context(f"/api/products?{query}&limit=10"):
+                statement = _product_query()[0].statement.compile(
+                    db.engine, compile_kwargs={"literal_binds": True}
+                )
+                plan = db.session.execute(text(f"EXPLAIN QUERY PLAN {statement}")).fetchall()
+            details = " ".join(row[-1] for row in plan)
+            self.assertIn("SEARCH products USING INDEX", details, query)
+
+    def test_products_snapshot(self):
+        """Test serving the catalog from the in-memory snapshot"""
+        self._add_catalog()
+        self.app.config["PRODUCT_SNAPSHOT_ENABLED"] = True
+        self.app.wsgi_app.store.check_interval = 0
+
+        response = self.client.get("/api/products")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json), 6)
+        self.assertEqual(response.json[0]["name"], "Apple")
+
+        response = self.client.get("/api/products/2")
+        self.assertEqual(response.json["name"], "Apricot")
+        response = self.client.get("/api/products/2", headers={"If-None-Match": response.headers["ETag"]})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get("/api/products/999").status_code, 404)
+
+        # A change to the database file swaps in a rebuilt snapshot
+        with self.app.app_context():
+            db.session.add(Product(name="Date", description="Fruit", price=7.0))
+            db.session.commit()
+        response = self.client.get("/api/products")
+        self.assertEqual(len(response.json), 7)
+
+        # Filtered requests still go through the database
+        response = self.client.get("/api/products?name_prefix=Da")
+        self.assertEqual([p["name"] for p in response.json], ["Date"])
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
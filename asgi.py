@@ -0,0 +1,213 @@
+"""
+ASGI host serving the BDD, BDD2, TDD and TDD2 APIs under the same prefixes
+as host.py.
+
+Clients are handled by the event loop: request bodies are read and responses
+written by coroutines, so thousands of slow or idle connections cost no
+thread. Only the app itself, from the start of a request to its last response
+chunk, runs on a thread of a bounded pool, which is where the blocking SQLite
+round trips happen. A client that reads a streamed response slowly only holds
+its thread once ``MAX_BUFFERED_CHUNKS`` chunks are waiting for it.
+
+Run it with any ASGI server, e.g.::
+
+    pip install uvicorn
+    uvicorn asgi:application --port 3000
+"""
+import asyncio
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import host
+
+# Threads running the apps. The default SQLite pool of an app allows 30
+# connections (SQLITE_POOL_SIZE + SQLITE_MAX_OVERFLOW): more threads would
+# only wait for one.
+THREADS = 32
+
+# Response chunks queued for a client before the app thread waits for it
+MAX_BUFFERED_CHUNKS = 64
+
+# Mark the end of a response in the chunk queue, complete or cut short
+_END = object()
+_ERROR = object()
+
+_INTERNAL_ERROR = (500, [(b"content-type", b"text/plain")])
+
+
+class ASGIAdapter:
+    """
+    ASGI application running the WSGI application ``wsgi_app`` on the threads
+    of ``executor``.
+    """
+
+    def __init__(self, wsgi_app, executor=None, max_buffered_chunks=MAX_BUFFERED_CHUNKS):
+        self.wsgi_app = wsgi_app
+        self.executor = executor or ThreadPoolExecutor(max_workers=THREADS, thread_name_prefix="asgi")
+        self.max_buffered_chunks = max_buffered_chunks
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        body = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue(self.max_buffered_chunks)
+        disconnected = threading.Event()
+        environ = wsgi_environ(scope, b"".join(body))
+        worker = loop.run_in_executor(self.executor, self._run, environ, loop, chunks, disconnected)
+        try:
+            start = await self._next(chunks, worker)
+            if start is _END or start is _ERROR:
+                # The app thread failed before it could hand over a status
+                start = _INTERNAL_ERROR
+                chunks.put_nowait(b"Internal Server Error")
+                chunks.put_nowait(_END)
+            status, headers = start
+            await send({"type": "http.response.start", "status": status, "headers": headers})
+            while True:
+                chunk = await self._next(chunks, worker)
+                if chunk is _END:
+                    await send({"type": "http.response.body", "body": b""})
+                    break
+                if chunk is _ERROR:
+                    # Leave the body unfinished: the exception raised by the
+                    # worker below makes the server abort the connection
+                    break
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        finally:
+            # Unblocks the app thread if the client went away mid-response
+            disconnected.set()
+            while not chunks.empty():
+                chunks.get_nowait()
+        await worker
+
+    @staticmethod
+    async def _next(chunks, worker):
+        """The next item of ``chunks``, or ``_ERROR`` if the app thread ended without queuing one."""
+        get = asyncio.ensure_future(chunks.get())
+        try:
+            await asyncio.wait((get, worker), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if not get.done():
+                get.cancel()
+        if get.done():
+            return get.result()
+        return chunks.get_nowait() if not chunks.empty() else _ERROR
+
+    def _run(self, environ, loop, chunks, disconnected):
+        """
+        Call the WSGI app and hand its status, headers and chunks over to the
+        event loop, then ``_END``, or ``_ERROR`` if the app fails once the
+        response has started.
+        """
+        def put(item):
+            if not disconnected.is_set():
+                asyncio.run_coroutine_threadsafe(chunks.put(item), loop).result()
+
+        response = []
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and started:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response[:] = [(int(status.split(" ", 1)[0]), [
+                (name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers
+            ])]
+
+        started = False
+        try:
+            result = self.wsgi_app(environ, start_response)
+            try:
+                for chunk in result:
+                    if not started:
+                        put(response[0])
+                        started = True
+                    put(chunk)
+                    if disconnected.is_set():
+                        break
+                if not started:
+                    put(response[0])
+                    started = True
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+        except BaseException:
+            if started:
+                put(_ERROR)
+            else:
+                put(_INTERNAL_ERROR)
+                put(b"Internal Server Error")
+                put(_END)
+            raise
+        put(_END)
+
+
+def wsgi_environ(scope, body):
+    """The WSGI environ of the ASGI HTTP ``scope``, with the request ``body`` already read."""
+    root_path = scope.get("root_path", "")
+    path = scope["path"]
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": root_path,
+        "PATH_INFO": path.encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1] or 80),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"], environ["REMOTE_PORT"] = scope["client"][0], str(scope["client"][1])
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            environ[name] = value
+            continue
+        key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def __getattr__(name):
+    # Built on first use, like host.application
+    global application
+    if name == "application":
+        application = ASGIAdapter(host.application)
+        return application
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,11 @@
+"""
+Load benchmarks for the BDD, BDD2, TDD and TDD2 APIs.
+
+Run from the repository root::
+
+    python -m benchmarks run --rows 100000 --mode http --concurrency 8 --output results.json
+    python -m benchmarks run --rows 10000 --mode http --concurrency 16 --workers 4 --only POST
+    python -m benchmarks compare baseline.json results.json --threshold 0.1
+
+See ``python -m benchmarks run --help`` for the options.
+"""
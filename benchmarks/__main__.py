@@ -0,0 +1,103 @@
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+
+from benchmarks.compare import compare
+from benchmarks.runner import peak_rss_mb, prepare_apps, run_http, run_in_process, serve
+from benchmarks.scenarios import TABLES, build_scenarios
+
+
+def run(args):
+    apps = args.app or list(TABLES)
+    scenarios = build_scenarios(apps, args.only)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        loaded = prepare_apps(apps, args.rows, workdir, args.seed)
+        server = serve(loaded, args.workers) if args.mode == "http" else None
+        try:
+            for scenario in scenarios:
+                if server is not None:
+                    result = run_http(server.port, scenario, args.requests, args.rows, args.concurrency, args.seed)
+                else:
+                    result = run_in_process(loaded[scenario.app], scenario, args.requests, args.rows, args.seed)
+                results[scenario.name] = result
+                print(f"{scenario.name:45} {result['throughput_rps']:>10.1f} req/s  "
+                      f"p50 {result['p50_ms']:>8.2f}  p95 {result['p95_ms']:>8.2f}  p99 {result['p99_ms']:>8.2f} ms"
+                      + (f"  {result['errors']} errors" if result["errors"] else ""), file=sys.stderr)
+        finally:
+            if server is not None:
+                server.shutdown()
+
+    report = {
+        "meta": {
+            "rows": args.rows,
+            "requests": args.requests,
+            "mode": args.mode,
+            "concurrency": args.concurrency if args.mode == "http" else 1,
+            "workers": args.workers if args.mode == "http" else 1,
+            "python": platform.python_version(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "scenarios": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+def compare_command(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    for key in ("rows", "mode", "concurrency", "workers"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            print(f"warning: {key} differs ({baseline['meta'].get(key)} vs {current['meta'].get(key)})")
+    regressions = compare(baseline, current, args.threshold)
+    for name, metric, before, after, change in regressions:
+        print(f"REGRESSION {name}: {metric} {before} -> {after} ({change:+.1%})")
+    if not regressions:
+        print(f"No regression above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Load benchmarks for the four apps")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="seed the apps and benchmark every endpoint")
+    run_parser.add_argument("--rows", type=int, default=1000,
+                            help="rows generated per seeded table, 1000 to 10000000 (default: 1000)")
+    run_parser.add_argument("--requests", type=int, default=500, help="requests per scenario (default: 500)")
+    run_parser.add_argument("--mode", choices=("inprocess", "http"), default="inprocess",
+                            help="call the WSGI app directly, or go through a local server (default: inprocess)")
+    run_parser.add_argument("--concurrency", type=int, default=8, help="client threads in http mode (default: 8)")
+    run_parser.add_argument("--workers", type=int, default=1,
+                            help="server processes forked after loading the apps, in http mode (default: 1)")
+    run_parser.add_argument("--app", action="append", choices=list(TABLES), help="only this app (repeatable)")
+    run_parser.add_argument("--only", help="only the scenarios whose name contains this text")
+    run_parser.add_argument("--seed", type=int, default=0, help="seed of the datasets and requests")
+    run_parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare", help="flag regressions against a baseline report")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1,
+                                help="tolerated slowdown as a fraction (default: 0.1)")
+    compare_parser.set_defaults(handler=compare_command)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
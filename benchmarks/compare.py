@@ -0,0 +1,28 @@
+"""
+Compare a benchmark result against a stored baseline.
+"""
+
+# Metrics checked for regressions: name -> True when higher is better
+METRICS = {"throughput_rps": True, "p95_ms": False, "p99_ms": False}
+
+
+def compare(baseline, current, threshold):
+    """
+    Return one ``(scenario, metric, baseline value, current value, change)``
+    tuple per metric of ``current`` that is worse than ``baseline`` by more
+    than ``threshold`` (a fraction, e.g. 0.1 for 10%). Scenarios missing from
+    either result are ignored.
+    """
+    regressions = []
+    for name, result in current["scenarios"].items():
+        reference = baseline["scenarios"].get(name)
+        if reference is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            before, after = reference[metric], result[metric]
+            if not before:
+                continue
+            change = (after - before) / before
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append((name, metric, before, after, change))
+    return regressions
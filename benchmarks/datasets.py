@@ -0,0 +1,81 @@
+"""
+Synthetic, reproducible rows for the users, products, orders and factures
+tables.
+
+Generators yield rows lazily so that 10M-row datasets are never held in
+memory; ``load()`` inserts them in chunks through the app's own engine and
+table definitions.
+"""
+import random
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+FIRST_NAMES = ("Alice", "Bruno", "Chloé", "David", "Emma", "Farid", "Gaëlle", "Hugo", "Inès", "Jules")
+LAST_NAMES = ("Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand", "Leroy", "Moreau")
+PRODUCT_WORDS = ("Apple", "Apricot", "Banana", "Cherry", "Grape", "Lemon", "Mango", "Peach", "Pear", "Plum")
+ORDER_STATUSES = ("pending", "processing", "shipped", "delivered", "cancelled")
+FACTURE_STATUSES = ("En attente", "Payée", "Annulée")
+
+# Rows per INSERT executemany
+CHUNK_SIZE = 10000
+
+
+def _customer(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def users(count, seed=0):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {"name": _customer(rng), "email": f"user{i}@example.com"}
+
+
+def products(count, seed=0):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {
+            "name": f"{rng.choice(PRODUCT_WORDS)} {i}",
+            "description": " ".join(rng.choices(PRODUCT_WORDS, k=rng.randint(5, 60))),
+            "price": round(rng.uniform(0.5, 500), 2),
+        }
+
+
+def orders(count, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    for _ in range(count):
+        yield {
+            "customer_name": _customer(rng),
+            "order_date": start + timedelta(seconds=rng.randint(0, 2 * 365 * 86400)),
+            "total_amount": round(rng.uniform(1, 1000), 2),
+            "status": rng.choice(ORDER_STATUSES),
+        }
+
+
+def factures(count, seed=0):
+    rng = random.Random(seed)
+    start = date(2022, 1, 1)
+    for _ in range(count):
+        yield {
+            "nom_client": _customer(rng),
+            "montant": round(rng.uniform(10, 5000), 2),
+            "date": start + timedelta(days=rng.randint(0, 3 * 365)),
+            "status": rng.choice(FACTURE_STATUSES),
+        }
+
+
+GENERATORS = {"users": users, "products": products, "orders": orders, "factures": factures}
+
+
+def load(app, table_name, count, seed=0):
+    """Insert ``count`` generated rows into ``table_name`` of ``app``'s database."""
+    db = app.extensions["sqlalchemy"]
+    with app.app_context():
+        table = db.metadata.tables[table_name]
+        rows = GENERATORS[table_name](count, seed)
+        with db.engine.begin() as connection:
+            while True:
+                chunk = list(islice(rows, CHUNK_SIZE))
+                if not chunk:
+                    break
+                connection.execute(table.insert(), chunk)
@@ -0,0 +1,180 @@
+"""
+Load the apps on a seeded copy of their databases and drive the scenarios,
+in process through the WSGI callable or over HTTP against a local threaded
+server.
+"""
+import http.client
+import json
+import os
+import random
+import resource
+import shutil
+import signal
+import socket
+import sys
+import threading
+import time
+
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+from werkzeug.exceptions import NotFound
+from werkzeug.serving import WSGIRequestHandler, make_server
+from werkzeug.test import Client
+
+import host
+from benchmarks import datasets
+from benchmarks.scenarios import TABLES
+
+# Copied app directories leave out the working files of the original
+COPY_IGNORE = shutil.ignore_patterns("instance", "tests", "__pycache__", "*.db", "*.db-*")
+
+
+def prepare_apps(apps, rows, workdir, seed=0):
+    """
+    Load each app from a copy in ``workdir`` so that its database files are
+    created there, seed its tables with ``rows`` generated rows, and return
+    the Flask apps by directory name.
+    """
+    loaded = {}
+    for directory in apps:
+        copy = os.path.join(workdir, directory)
+        shutil.copytree(os.path.join(host.ROOT, directory), copy, ignore=COPY_IGNORE)
+        app = host.load_app(copy)
+        for table in TABLES[directory]:
+            datasets.load(app, table, rows, seed)
+        counters = app.extensions.get("order_counters")
+        if counters is not None:
+            with app.app_context():
+                counters.reconcile()
+        loaded[directory] = app
+    return loaded
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def summarize(latencies, errors, elapsed):
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def run_in_process(app, scenario, requests, rows, seed=0):
+    """Send ``requests`` requests of ``scenario`` straight to the WSGI app, one at a time."""
+    client = Client(app)
+    rng = random.Random(seed)
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        path, body = scenario.build(rng, rows)
+        before = time.perf_counter()
+        response = client.open(path, method=scenario.method, json=body)
+        response.close()
+        latencies.append(time.perf_counter() - before)
+        errors += response.status_code >= 400
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Request handler that does not log every request."""
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class PreforkServer:
+    """
+    ``workers`` processes forked after the apps were loaded, each serving
+    them from its own threaded server on one shared listening socket, as a
+    pre-fork server such as gunicorn does with ``preload_app``.
+    """
+
+    def __init__(self, application, workers):
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.port = self.listener.getsockname()[1]
+        self.pids = []
+        for _ in range(workers):
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    host.dispose_engines(application)
+                    make_server("127.0.0.1", self.port, application, threaded=True,
+                                request_handler=QuietRequestHandler, fd=self.listener.fileno()).serve_forever()
+                finally:
+                    os._exit(0)
+            self.pids.append(pid)
+
+    def shutdown(self):
+        for pid in self.pids:
+            os.kill(pid, signal.SIGTERM)
+        for pid in self.pids:
+            os.waitpid(pid, 0)
+        self.listener.close()
+
+
+def serve(apps, workers=1):
+    """
+    Serve ``apps`` (by directory name) under their host.py prefixes from a
+    threaded local server, or from ``workers`` forked ones. Returns the
+    server, whose ``port`` is set; call ``shutdown()`` when done.
+    """
+    mounts = {prefix: apps[directory] for prefix, directory in host.MOUNTS.items() if directory in apps}
+    application = DispatcherMiddleware(NotFound(), mounts)
+    if workers > 1:
+        return PreforkServer(application, workers)
+    server = make_server("127.0.0.1", 0, application, threaded=True, request_handler=QuietRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_http(port, scenario, requests, rows, concurrency, seed=0):
+    """Send ``requests`` requests of ``scenario`` to the local server from ``concurrency`` client threads."""
+    prefix = next(prefix for prefix, directory in host.MOUNTS.items() if directory == scenario.app)
+    lock = threading.Lock()
+    latencies, errors = [], [0]
+
+    def client(index, count):
+        rng = random.Random(seed + index)
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        local = []
+        failed = 0
+        for _ in range(count):
+            path, body = scenario.build(rng, rows)
+            payload = json.dumps(body) if body is not None else None
+            headers = {"Content-Type": "application/json"} if body is not None else {}
+            before = time.perf_counter()
+            connection.request(scenario.method, prefix + path, body=payload, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            local.append(time.perf_counter() - before)
+            failed += response.status >= 400
+        connection.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    shares = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+    threads = [threading.Thread(target=client, args=(i, share)) for i, share in enumerate(shares) if share]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, errors[0], time.perf_counter() - started)
@@ -0,0 +1,141 @@
+"""
+One scenario per endpoint of the four apps.
+
+A scenario builds each request from a random generator and the number of
+seeded rows. Within an app, reads come first, then writes, then deletes, so
+that every scenario runs against the seeded dataset.
+"""
+import itertools
+from dataclasses import dataclass
+from typing import Callable
+
+from benchmarks import datasets
+
+# App directory -> tables seeded with the dataset
+TABLES = {
+    "BDD": ("users", "products"),
+    "BDD2": ("users", "factures"),
+    "TDD": ("users", "orders"),
+    "TDD2": ("users", "products"),
+}
+
+
+@dataclass
+class Scenario:
+    app: str
+    method: str
+    route: str
+    # (rng, rows) -> (path, JSON body or None)
+    build: Callable
+
+    @property
+    def name(self):
+        return f"{self.app} {self.method} {self.route}"
+
+
+def _get(path):
+    return lambda rng, rows: (path, None)
+
+
+def _random_id(resource, body=None):
+    return lambda rng, rows: (f"/api/{resource}/{rng.randint(1, rows)}", body)
+
+
+def _delete(resource):
+    """Delete distinct ids, from the last seeded row downwards."""
+    ids = None
+
+    def build(rng, rows):
+        nonlocal ids
+        if ids is None:
+            ids = itertools.count(rows, -1)
+        return f"/api/{resource}/{next(ids)}", None
+    return build
+
+
+def _user_reads(app):
+    return [
+        # Unpaginated: its cost grows with the dataset
+        Scenario(app, "GET", "/api/users", _get("/api/users")),
+        Scenario(app, "GET", "/api/users/<id>", _random_id("users")),
+    ]
+
+
+def _user_writes(app):
+    return [
+        Scenario(app, "POST", "/api/users", lambda rng, rows: (
+            "/api/users", {"name": "Bench User", "email": f"bench{rng.getrandbits(64)}@example.com"})),
+        Scenario(app, "POST", "/api/users/batch", lambda rng, rows: ("/api/users/batch", [
+            {"name": "Batch User", "email": f"user{rng.randint(0, rows - 1)}@example.com"} for _ in range(100)])),
+        Scenario(app, "PUT", "/api/users/<id>", _random_id("users", {"name": "Renamed User"})),
+    ]
+
+
+def _product_reads(app):
+    return [
+        Scenario(app, "GET", "/api/products?limit", _get("/api/products?limit=50")),
+        Scenario(app, "GET", "/api/products?filters", lambda rng, rows: (
+            f"/api/products?min_price={rng.randint(1, 400)}&sort=price&limit=50&fields=name,price", None)),
+        Scenario(app, "GET", "/api/products/<id>", _random_id("products")),
+    ]
+
+
+def _scenarios():
+    facture = {"nom_client": "Client Bench", "montant": 120.0, "date": "2024-06-01", "status": "En attente"}
+    return {
+        "BDD": _user_reads("BDD") + _product_reads("BDD") + _user_writes("BDD") + [
+            Scenario("BDD", "POST", "/api/products", lambda rng, rows: (
+                "/api/products", {"name": "Bench Product", "description": "Benchmark", "price": 9.99})),
+            Scenario("BDD", "PUT", "/api/products/<id>", lambda rng, rows: (
+                f"/api/products/{rng.randint(1, rows)}", {"price": round(rng.uniform(1, 100), 2)})),
+            Scenario("BDD", "DELETE", "/api/products/<id>", _delete("products")),
+            Scenario("BDD", "DELETE", "/api/users/<id>", _delete("users")),
+        ],
+        "BDD2": _user_reads("BDD2") + [
+            Scenario("BDD2", "GET", "/api/factures?limit", lambda rng, rows: (
+                f"/api/factures?limit=50&after={rng.randint(0, rows)}", None)),
+            Scenario("BDD2", "GET", "/api/factures?filters",
+                     _get("/api/factures?from=2023-01-01&to=2023-01-31&status=Pay%C3%A9e&limit=50")),
+            Scenario("BDD2", "GET", "/api/factures/export",
+                     _get("/api/factures/export?format=ndjson&from=2023-01-01&to=2023-01-07")),
+            Scenario("BDD2", "GET", "/api/factures/stats", _get("/api/factures/stats")),
+            Scenario("BDD2", "GET", "/api/factures/search", lambda rng, rows: (
+                f"/api/factures/search?q={rng.choice(datasets.LAST_NAMES)}", None)),
+            Scenario("BDD2", "GET", "/api/factures/<id>", _random_id("factures")),
+        ] + _user_writes("BDD2") + [
+            Scenario("BDD2", "POST", "/api/factures", lambda rng, rows: ("/api/factures", facture)),
+            Scenario("BDD2", "POST", "/api/factures/batch", lambda rng, rows: ("/api/factures/batch", [facture] * 100)),
+            Scenario("BDD2", "PUT", "/api/factures/<id>", _random_id("factures", dict(facture, status="Payée"))),
+            Scenario("BDD2", "PATCH", "/api/factures/<id>", _random_id("factures", {"status": "Payée"})),
+            Scenario("BDD2", "POST", "/api/factures/status", lambda rng, rows: ("/api/factures/status", {
+                "status": "Payée", "ids": [rng.randint(1, rows) for _ in range(50)]})),
+            Scenario("BDD2", "DELETE", "/api/factures/<id>", _delete("factures")),
+            Scenario("BDD2", "DELETE", "/api/users/<id>", _delete("users")),
+        ],
+        "TDD": _user_reads("TDD") + [
+            Scenario("TDD", "GET", "/api/orders?filters", lambda rng, rows: (
+                f"/api/orders?status={rng.choice(datasets.ORDER_STATUSES)}&since=2025-06-01&limit=50", None)),
+            Scenario("TDD", "GET", "/api/orders/<id>", _random_id("orders")),
+            Scenario("TDD", "GET", "/api/orders/status-counts", _get("/api/orders/status-counts")),
+        ] + _user_writes("TDD") + [
+            Scenario("TDD", "POST", "/api/orders", lambda rng, rows: (
+                "/api/orders", {"customer_name": "Bench Customer", "total_amount": 42.0})),
+            Scenario("TDD", "PUT", "/api/orders/<id>", lambda rng, rows: (
+                f"/api/orders/{rng.randint(1, rows)}", {"status": rng.choice(datasets.ORDER_STATUSES)})),
+            Scenario("TDD", "DELETE", "/api/orders/<id>", _delete("orders")),
+            Scenario("TDD", "DELETE", "/api/users/<id>", _delete("users")),
+        ],
+        # The TDD2 catalog is read-only
+        "TDD2": _user_reads("TDD2") + _product_reads("TDD2") + _user_writes("TDD2") + [
+            Scenario("TDD2", "DELETE", "/api/users/<id>", _delete("users")),
+        ],
+    }
+
+
+def build_scenarios(apps=None, only=None):
+    """The scenarios of ``apps`` (all by default) whose name contains ``only``, if given."""
+    return [
+        scenario
+        for app, scenarios in _scenarios().items() if not apps or app in apps
+        for scenario in scenarios if only is None or only in scenario.name
+    ]
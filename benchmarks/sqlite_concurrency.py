@@ -0,0 +1,125 @@
+"""
+Reader/writer concurrency on one SQLite file, before and after the engine
+profile (``Config.SQLITE_PRAGMAS``).
+
+Reader threads page through a table while one writer thread inserts and
+commits a row at a time, as the API handlers do. The same workload runs with
+SQLite's defaults (rollback journal, ``synchronous=FULL``) and with the
+profile of ``BDD/config.py``, and the reads/s, writes/s, worst read latency
+and "database is locked" errors are printed for both::
+
+    python benchmarks/sqlite_concurrency.py --readers 4 --duration 5
+"""
+import argparse
+import importlib.util
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_profile(directory="BDD"):
+    """``Config.SQLITE_PRAGMAS`` of an app, read without importing the app."""
+    spec = importlib.util.spec_from_file_location("config", os.path.join(ROOT, directory, "config.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return dict(module.Config.SQLITE_PRAGMAS)
+
+
+def connect(path, pragmas):
+    connection = sqlite3.connect(path, check_same_thread=False)
+    for name, value in pragmas.items():
+        connection.execute(f"PRAGMA {name}={value}")
+    return connection
+
+
+def run(pragmas, readers, duration, rows):
+    """Run the workload with ``pragmas`` and return its measurements."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        connection = connect(path, pragmas)
+        connection.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT NOT NULL, price REAL NOT NULL)")
+        connection.executemany("INSERT INTO items (name, price) VALUES (?, ?)",
+                               ((f"item {i}", i * 0.5) for i in range(rows)))
+        connection.commit()
+        connection.close()
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        stats = {"reads": 0, "writes": 0, "locked": 0, "worst_read": 0.0}
+
+        def record(**values):
+            with lock:
+                for key, value in values.items():
+                    stats[key] = max(stats[key], value) if key == "worst_read" else stats[key] + value
+
+        def reader(offset):
+            connection = connect(path, pragmas)
+            last_id = offset
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    page = connection.execute(
+                        "SELECT id, name, price FROM items WHERE id > ? ORDER BY id LIMIT 100", (last_id,)
+                    ).fetchall()
+                except sqlite3.OperationalError:
+                    record(locked=1)
+                    continue
+                record(reads=1, worst_read=time.perf_counter() - started)
+                last_id = page[-1][0] if len(page) == 100 else 0
+            connection.close()
+
+        def writer():
+            connection = connect(path, pragmas)
+            count = 0
+            while not stop.is_set():
+                try:
+                    connection.execute("INSERT INTO items (name, price) VALUES (?, ?)", (f"new {count}", 1.0))
+                    connection.commit()
+                except sqlite3.OperationalError:
+                    connection.rollback()
+                    record(locked=1)
+                    continue
+                count += 1
+                record(writes=1)
+            connection.close()
+
+        threads = [threading.Thread(target=reader, args=(i * 1000,)) for i in range(readers)]
+        threads.append(threading.Thread(target=writer))
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    return {
+        "reads/s": stats["reads"] / duration,
+        "writes/s": stats["writes"] / duration,
+        "worst read (ms)": stats["worst_read"] * 1000,
+        "locked errors": stats["locked"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--readers", type=int, default=4, help="reader threads (default: 4)")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per run (default: 5)")
+    parser.add_argument("--rows", type=int, default=10000, help="rows in the table before the run")
+    args = parser.parse_args()
+
+    profiles = {"defaults": {}, "profile": load_profile()}
+    results = {name: run(pragmas, args.readers, args.duration, args.rows) for name, pragmas in profiles.items()}
+
+    print(f"{'':18}" + "".join(f"{name:>14}" for name in results))
+    for metric in results["defaults"]:
+        values = (result[metric] for result in results.values())
+        print(f"{metric:18}" + "".join(f"{value:>14.1f}" if isinstance(value, float) else f"{value:>14}"
+                                        for value in values))
+
+
+if __name__ == "__main__":
+    main()
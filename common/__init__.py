@@ -0,0 +1,13 @@
+"""
+Code shared by the BDD, BDD2, TDD and TDD2 apps: engine profile, schema
+upgrades, table versions and ETags, caches, serialization, metrics, the slow
+query log, and the user model and routes.
+
+Each app keeps its own ``db`` (``models/database.py``), models and database
+file. The shared code takes the database of the current app from
+``current_app`` rather than importing a ``db`` of its own, so the four apps can
+use it side by side in one process (see host.py). Shared models are mixins
+that each app binds to its ``db``, e.g. ``class User(UserMixin, db.Model)``.
+
+The apps put the repository root on ``sys.path`` in their ``app.py``.
+"""
@@ -0,0 +1,201 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from flask import Response, request
+from sqlalchemy import event
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_MIMETYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense. Not locked: see Metrics."""
+    __slots__ = ("counts", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+
+    def samples(self, name, labels):
+        """Exposition lines of the histogram for ``labels`` (already formatted)."""
+        separator = "," if labels else ""
+        suffix = f"{{{labels}}}" if labels else ""
+        total = 0
+        for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), self.counts):
+            total += count
+            yield f'{name}_bucket{{{labels}{separator}le="{bound}"}} {total}'
+        yield f"{name}_sum{suffix} {self.sum}"
+        yield f"{name}_count{suffix} {total}"
+
+
+class Metrics:
+    """
+    Request and database metrics of one app, exposed in Prometheus text format.
+
+    Requests are labelled by route template (``/api/products/<int:product_id>``)
+    and method. A request is recorded when its response is closed, so the
+    time and SQL statements of a streamed body are included. The per-request
+    work is a few dict updates under one lock; formatting only happens when
+    /metrics is scraped. Values are local to the process: with several
+    workers each one reports its own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}  # (route, method, status) -> count
+        self.errors = {}  # (route, method) -> count of 5xx
+        self.latency = {}  # (route, method) -> Histogram
+        self.statements = {}  # (route, method) -> [count, seconds]
+        self.checkout_wait = Histogram()
+
+    def observe_request(self, route, method, status, duration, statements, statement_time):
+        key = (route, method)
+        with self._lock:
+            self.requests[key + (status,)] = self.requests.get(key + (status,), 0) + 1
+            if status >= 500:
+                self.errors[key] = self.errors.get(key, 0) + 1
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram()
+            histogram.observe(duration)
+            totals = self.statements.setdefault(key, [0, 0.0])
+            totals[0] += statements
+            totals[1] += statement_time
+
+    def observe_checkout(self, wait):
+        with self._lock:
+            self.checkout_wait.observe(wait)
+
+    def render(self, pool=None):
+        """The metrics in Prometheus text exposition format."""
+        with self._lock:
+            lines = [
+                "# HELP http_requests_total Requests handled, by route, method and status.",
+                "# TYPE http_requests_total counter",
+            ]
+            lines += [f'http_requests_total{{{_labels(route, method)},status="{status}"}} {count}'
+                      for (route, method, status), count in sorted(self.requests.items())]
+            lines += [
+                "# HELP http_request_errors_total Requests answered with a 5xx status.",
+                "# TYPE http_request_errors_total counter",
+            ]
+            lines += [f"http_request_errors_total{{{_labels(*key)}}} {count}"
+                      for key, count in sorted(self.errors.items())]
+            lines += [
+                "# HELP http_request_duration_seconds Time spent handling requests.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for key, histogram in sorted(self.latency.items()):
+                lines += histogram.samples("http_request_duration_seconds", _labels(*key))
+            lines += [
+                "# HELP db_statements_total SQL statements executed while handling requests.",
+                "# TYPE db_statements_total counter",
+            ]
+            lines += [f"db_statements_total{{{_labels(*key)}}} {count}"
+                      for key, (count, _) in sorted(self.statements.items())]
+            lines += [
+                "# HELP db_statement_seconds_total Time spent executing SQL statements while handling requests.",
+                "# TYPE db_statement_seconds_total counter",
+            ]
+            lines += [f"db_statement_seconds_total{{{_labels(*key)}}} {seconds}"
+                      for key, (_, seconds) in sorted(self.statements.items())]
+            lines += [
+                "# HELP db_pool_checkout_wait_seconds Time taken to check a connection out of the pool.",
+                "# TYPE db_pool_checkout_wait_seconds histogram",
+            ]
+            lines += self.checkout_wait.samples("db_pool_checkout_wait_seconds", "")
+
+        if pool is not None and hasattr(pool, "checkedout"):
+            lines += [
+                "# HELP db_pool_size Connections kept open by the pool.",
+                "# TYPE db_pool_size gauge",
+                f"db_pool_size {pool.size()}",
+                "# HELP db_pool_checked_out Connections currently checked out of the pool.",
+                "# TYPE db_pool_checked_out gauge",
+                f"db_pool_checked_out {pool.checkedout()}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def _labels(route, method):
+    route = route.replace("\\", "\\\\").replace('"', '\\"')
+    return f'route="{route}",method="{method}"'
+
+
+class _RequestStats:
+    """Time and SQL statements of the request being handled, its streamed body included."""
+    __slots__ = ("started", "statements", "statement_time")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.statement_time = 0.0
+
+
+# Stats of the request the current thread is handling, from before_request
+# until its response is closed. Unlike ``g`` it is still set while a streamed
+# body runs, with or without stream_with_context.
+_current_request = ContextVar("metrics_current_request", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_request.get() is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    stats = _current_request.get()
+    if started is not None and stats is not None:
+        stats.statements += 1
+        stats.statement_time += time.perf_counter() - started
+
+
+def init_metrics(app):
+    """
+    Record request and database metrics for ``app`` and serve them at
+    ``/metrics``, when METRICS_ENABLED is set.
+    """
+    if not app.config.get("METRICS_ENABLED"):
+        return
+    metrics = app.extensions["metrics"] = Metrics()
+
+    with app.app_context():
+        engine = app.extensions["sqlalchemy"].engine
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    if hasattr(engine.pool, "wait_observer"):
+        engine.pool.wait_observer = metrics.observe_checkout
+
+    @app.before_request
+    def start_timer():
+        _current_request.set(_RequestStats())
+
+    @app.after_request
+    def record_request(response):
+        stats = _current_request.get()
+        if stats is None:
+            return response
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        method, status = request.method, response.status_code
+
+        # Recorded once the body has been sent: a streamed body runs after this hook
+        def record():
+            _current_request.set(None)
+            metrics.observe_request(route, method, status, time.perf_counter() - stats.started,
+                                    stats.statements, stats.statement_time)
+
+        response.call_on_close(record)
+        return response
+
+    @app.route("/metrics")
+    def get_metrics():
+        return Response(metrics.render(engine.pool), mimetype=PROMETHEUS_MIMETYPE)
@@ -0,0 +1,6 @@
+from flask import current_app
+
+
+def current_db():
+    """The Flask-SQLAlchemy extension (the ``db``) of the current app."""
+    return current_app.extensions["sqlalchemy"]
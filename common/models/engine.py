@@ -0,0 +1,73 @@
+import sqlite3
+import time
+
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that reports how long each checkout took, waiting for a free
+    connection included, to ``wait_observer`` when one is set.
+    """
+    wait_observer = None
+
+    def connect(self):
+        started = time.perf_counter()
+        connection = super().connect()
+        if self.wait_observer is not None:
+            self.wait_observer(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() replaces the pool: keep the observer
+        pool = super().recreate()
+        pool.wait_observer = self.wait_observer
+        return pool
+
+
+def _is_memory_database(uri):
+    return uri in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in uri
+
+
+def engine_options(config):
+    """
+    SQLAlchemy engine options for the ``SQLITE_*`` settings of ``config``.
+
+    In-memory databases keep Flask-SQLAlchemy's single shared connection, so
+    the pool settings only apply to database files.
+    """
+    options = dict(config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+    if not _is_memory_database(config["SQLALCHEMY_DATABASE_URI"]):
+        options.setdefault("poolclass", TimedQueuePool)
+        options.setdefault("pool_size", config["SQLITE_POOL_SIZE"])
+        options.setdefault("max_overflow", config["SQLITE_MAX_OVERFLOW"])
+        options.setdefault("pool_timeout", config["SQLITE_POOL_TIMEOUT"])
+    return options
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    """Run ``PRAGMA name=value`` on a new sqlite3 connection for each item of ``pragmas``."""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def init_database(app, db):
+    """
+    Initialize ``db`` (the app's Flask-SQLAlchemy extension) for ``app`` with
+    the engine profile of its ``SQLITE_*`` settings: pool options, and pragmas
+    applied to every connection the pool opens.
+    """
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config)
+    pragmas = dict(app.config["SQLITE_PRAGMAS"])
+
+    def on_connect(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, pragmas)
+
+    db.init_app(app)
+    with app.app_context():
+        event.listen(db.engine, "connect", on_connect)
@@ -0,0 +1,61 @@
+from common.models.database import current_db
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn, CreateTable
+
+
+def add_missing_columns(connection, metadata):
+    """Add the columns of ``metadata`` that existing tables lack (they must have a server default)."""
+    inspector = inspect(connection)
+    for table in metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                definition = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {definition}"))
+
+
+def add_autoincrement(connection, metadata):
+    """
+    Rebuild the existing tables that ``metadata`` declares with
+    ``sqlite_autoincrement`` but that were created without it.
+
+    Without AUTOINCREMENT SQLite gives a new row the id of the last row if it
+    was deleted. Rows keep their ids; the indexes of a rebuilt table are
+    dropped with the old one, so run ``create_missing_indexes()`` afterwards.
+    """
+    for table in metadata.sorted_tables:
+        if not table.dialect_options["sqlite"]["autoincrement"]:
+            continue
+        definition = connection.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table.name}
+        ).scalar()
+        if definition is None or "AUTOINCREMENT" in definition.upper():
+            continue
+        columns = ", ".join(column.name for column in table.columns)
+        connection.execute(text(f"ALTER TABLE {table.name} RENAME TO {table.name}_old"))
+        connection.execute(CreateTable(table))
+        connection.execute(text(f"INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {table.name}_old"))
+        connection.execute(text(f"DROP TABLE {table.name}_old"))
+
+
+def create_missing_indexes(connection, metadata):
+    """Create the indexes of ``metadata`` that existing tables lack."""
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def upgrade_schema():
+    """
+    Bring the database of the current app, created by an earlier version of
+    the app, up to date.
+
+    ``db.create_all()`` only creates missing tables; this also adds the
+    columns, AUTOINCREMENT and indexes declared on the models that existing
+    tables lack. Idempotent.
+    """
+    db = current_db()
+    with db.engine.begin() as connection:
+        add_missing_columns(connection, db.metadata)
+        add_autoincrement(connection, db.metadata)
+        create_missing_indexes(connection, db.metadata)
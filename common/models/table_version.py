@@ -0,0 +1,46 @@
+from common.models.database import current_db
+from sqlalchemy import Column, Integer, String, func, select
+from sqlalchemy.dialects.sqlite import insert
+
+
+class TableVersionMixin:
+    """Per-table write counter, bumped in the same transaction as every write."""
+    __tablename__ = "table_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+def _table_versions():
+    return current_db().metadata.tables["table_versions"]
+
+
+def bump_version(name, connection=None):
+    """
+    Increment the version of table ``name`` within the current transaction of
+    ``connection`` (the session by default) and return the new version.
+    """
+    table = _table_versions()
+    statement = insert(table).values(name=name, version=1)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.name],
+        set_={"version": table.c.version + 1}
+    ).returning(table.c.version)
+    return (connection or current_db().session).execute(statement).scalar_one()
+
+
+def current_version(name):
+    """Return the version of table ``name`` (0 if it was never written)."""
+    table = _table_versions()
+    statement = select(table.c.version).where(table.c.name == name)
+    return current_db().session.execute(statement).scalar() or 0
+
+
+def version_subquery(name):
+    """
+    The version of table ``name`` (0 if it was never written) as a scalar
+    subquery, to read it in the same statement, so the same snapshot, as rows
+    of the table.
+    """
+    table = _table_versions()
+    return func.coalesce(select(table.c.version).where(table.c.name == name).scalar_subquery(), 0)
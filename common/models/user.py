@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, literal_column
+
+
+class UserMixin:
+    """Columns of the ``users`` table; each app binds it to its own ``db``."""
+    __tablename__ = "users"
+    # Ids of deleted users are never reused: they key cached JSON fragments
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False)
+    email = Column(String(100), unique=True, nullable=False)
+    # Incremented by every UPDATE; keys the cached JSON fragment of the row
+    version = Column(Integer, nullable=False, default=1, server_default="1",
+                     onupdate=literal_column("version + 1"))
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name, "email": self.email}
@@ -0,0 +1,108 @@
+import re
+import sqlite3
+import time
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+# Statements EXPLAIN QUERY PLAN accepts; PRAGMA, BEGIN, ... are not explained
+EXPLAINABLE = re.compile(r"\s*(SELECT|INSERT|UPDATE|DELETE|WITH|REPLACE)\b", re.IGNORECASE)
+
+# A plan step reading a whole table: "SCAN users" ("SCAN TABLE users" before
+# SQLite 3.36). "SCAN users USING INDEX ..." walks an index in order and is not
+# reported.
+FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+
+
+def parameters_shape(parameters, executemany=False):
+    """
+    The types of the bound ``parameters``, without their values: ``(int, str)``,
+    or ``500 x (str, float)`` for an executemany.
+    """
+    if executemany:
+        if not parameters:
+            return "0 x ()"
+        return f"{len(parameters)} x {parameters_shape(parameters[0])}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{name}: {type(value).__name__}" for name, value in parameters.items()) + "}"
+    return "(" + ", ".join(type(value).__name__ for value in parameters or ()) + ")"
+
+
+def explain(dbapi_connection, statement, parameters):
+    """
+    The EXPLAIN QUERY PLAN rows of ``statement`` as ``(depth, detail)`` pairs,
+    run on a separate cursor so that the results of the profiled one are left
+    alone.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        rows = cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    finally:
+        cursor.close()
+    depths = {0: -1}
+    plan = []
+    for node, parent, _, detail in rows:
+        depths[node] = depths.get(parent, -1) + 1
+        plan.append((depths[node], detail))
+    return plan
+
+
+def full_scans(plan, tables):
+    """The tables of ``tables`` that ``plan`` reads in full."""
+    scanned = []
+    for _, detail in plan:
+        match = FULL_SCAN.match(detail)
+        if match and match.group(1) in tables and match.group(1) not in scanned:
+            scanned.append(match.group(1))
+    return scanned
+
+
+def _origin():
+    if not has_request_context():
+        return "outside a request"
+    rule = request.url_rule.rule if request.url_rule is not None else request.path
+    return f"{request.method} {rule}"
+
+
+def init_query_profiler(app):
+    """
+    Log, as warnings of ``app.logger``, every statement that takes longer than
+    SLOW_QUERY_THRESHOLD seconds, with the shape of its parameters, the route
+    it ran for and its query plan, when SLOW_QUERY_LOG_ENABLED is set. Full
+    scans of the SLOW_QUERY_SCAN_TABLES are called out in the first line.
+    """
+    if not app.config.get("SLOW_QUERY_LOG_ENABLED"):
+        return
+    threshold = app.config["SLOW_QUERY_THRESHOLD"]
+    tables = frozenset(app.config["SLOW_QUERY_SCAN_TABLES"])
+    logger = app.logger
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._profiler_started = time.perf_counter()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._profiler_started
+        if elapsed < threshold:
+            return
+
+        lines = [statement.strip(), f"parameters: {parameters_shape(parameters, executemany)}"]
+        scanned = []
+        if EXPLAINABLE.match(statement) and isinstance(cursor, sqlite3.Cursor):
+            try:
+                plan = explain(cursor.connection, statement, parameters[0] if executemany else parameters)
+            except sqlite3.Error as e:
+                lines.append(f"plan: unavailable ({e})")
+            else:
+                scanned = full_scans(plan, tables)
+                lines.append("plan:")
+                lines += ["  " * (depth + 1) + detail for depth, detail in plan]
+
+        header = f"Slow query ({elapsed * 1000:.1f} ms) in {_origin()}"
+        if scanned:
+            header += f": full scan of {', '.join(scanned)}"
+        logger.warning("%s\n    %s", header, "\n".join(lines).replace("\n", "\n    "))
+
+    with app.app_context():
+        engine = app.extensions["sqlalchemy"].engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
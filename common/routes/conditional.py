@@ -0,0 +1,56 @@
+import json
+import zlib
+from functools import wraps
+
+from flask import Response, make_response, request
+from common.models.table_version import current_version
+
+
+def conditional(table):
+    """
+    Give the decorated GET view an ETag derived from ``table``'s version.
+
+    The ETag combines the table version with the request path and query
+    string, so every filtered or paginated representation gets its own tag.
+    When the client's If-None-Match already matches, the view is skipped and
+    304 Not Modified is returned after a single primary-key lookup.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # The version is read before the rows: a concurrent write can only
+            # make the tag older than the body, never newer.
+            path_hash = zlib.crc32(request.full_path.encode())
+            etag = f"{table}-{current_version(table)}-{path_hash:08x}"
+            return with_etag(etag, lambda: view(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def with_etag(etag, build):
+    """
+    304 Not Modified if the request's If-None-Match already has ``etag``,
+    otherwise the response returned by ``build()``, tagged when it is a 200.
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    response = make_response(build())
+    if response.status_code == 200:
+        response.set_etag(etag)
+    return response
+
+
+def row_etag(table, row_id, version, payload):
+    """
+    ETag of the row ``row_id`` of ``table`` served as ``payload``.
+
+    Unlike ``conditional`` it needs no query: it can be cached along with the
+    payload. The version changes on every update of the row, and the payload
+    checksum tells apart the ``fields=`` variants and a row recreated under a
+    reused id.
+    """
+    checksum = zlib.crc32(json.dumps(payload, sort_keys=True, default=str).encode())
+    return f"{table}-{row_id}-{version}-{checksum:08x}"
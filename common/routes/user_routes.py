@@ -0,0 +1,161 @@
+from flask import Blueprint, Response, current_app, request, jsonify
+from common.models.database import current_db
+from common.models.table_version import bump_version
+from common.routes.conditional import conditional, row_etag, with_etag
+from common.serialization import fragment_cache, load_fields, parse_fields, render_fields, render_list, sparse_dict
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import IntegrityError
+
+user_routes = Blueprint("user_routes", __name__)
+
+# Rows per INSERT ... ON CONFLICT statement in /users/batch (2 parameters per
+# row, well below SQLite's bound-variable limit)
+UPSERT_CHUNK_SIZE = 5000
+
+def register_user_routes(app, user_model, url_prefix="/api"):
+    """Serve the users of ``user_model`` (the app's ``UserMixin`` model) under ``url_prefix``."""
+    app.extensions["user_model"] = user_model
+    app.register_blueprint(user_routes, url_prefix=url_prefix)
+
+def _user_model():
+    return current_app.extensions["user_model"]
+
+def _user_cache():
+    """The app's user cache, or None when USER_CACHE_ENABLED is off."""
+    if not current_app.config.get("USER_CACHE_ENABLED"):
+        return None
+    return current_app.extensions.get("user_cache")
+
+def _invalidate(user_ids):
+    """Drop the given users from the lookup cache and the list fragment cache."""
+    caches = [_user_cache(), fragment_cache(current_app, "users")]
+    for cache in caches:
+        if cache is not None:
+            for user_id in user_ids:
+                cache.invalidate(user_id)
+
+@user_routes.route("/users", methods=["GET"])
+@conditional("users")
+def get_users():
+    User = _user_model()
+    try:
+        fields = parse_fields(User, request.args.get("fields"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = User.query.order_by(User.id)
+    if fields is not None:
+        body = render_fields(query, fields)
+    else:
+        body = render_list(query, fragment_cache(current_app, "users"))
+    return Response(body, mimetype="application/json"), 200
+
+@user_routes.route("/users/<int:user_id>", methods=["GET"])
+def get_user(user_id):
+    User = _user_model()
+    try:
+        fields = parse_fields(User, request.args.get("fields"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if fields is not None:
+        user = load_fields(User.query.filter_by(id=user_id), fields, User.version).first()
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+        payload = sparse_dict(user, fields)
+        return with_etag(row_etag("users", user_id, user.version, payload), lambda: (jsonify(payload), 200))
+
+    # The ETag is cached with the payload: a cache hit, 304 or not, runs no query
+    cache = _user_cache()
+    entry = cache.get(user_id) if cache else None
+    if entry is None:
+        user = User.query.get(user_id)
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+        payload = user.to_dict()
+        entry = (payload, row_etag("users", user_id, user.version, payload))
+        if cache:
+            cache.set(user_id, entry)
+    payload, etag = entry
+    return with_etag(etag, lambda: (jsonify(payload), 200))
+
+@user_routes.route("/users", methods=["POST"])
+def create_user():
+    User = _user_model()
+    db = current_db()
+    data = request.get_json()
+    if not data.get("name") or not data.get("email"):
+        return jsonify({"error": "Name and email are required"}), 400
+
+    # The unique index on email rejects duplicates within the INSERT itself
+    new_user = User(name=data["name"], email=data["email"])
+    db.session.add(new_user)
+    try:
+        bump_version("users")
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": "Email already exists"}), 400
+    return jsonify(new_user.to_dict()), 201
+
+@user_routes.route("/users/batch", methods=["POST"])
+def upsert_users():
+    User = _user_model()
+    db = current_db()
+    data = request.get_json(silent=True)
+    if not isinstance(data, list) or not data:
+        return jsonify({"error": "Expected a non-empty array of users"}), 400
+
+    # When an email appears several times in the batch, the last one wins
+    rows = {}
+    for index, item in enumerate(data):
+        if not isinstance(item, dict) or not item.get("name") or not item.get("email"):
+            return jsonify({"error": f"Name and email are required (item {index})"}), 400
+        rows[item["email"]] = {"name": item["name"], "email": item["email"]}
+    rows = list(rows.values())
+
+    users = []
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        statement = insert(User).values(rows[start:start + UPSERT_CHUNK_SIZE])
+        statement = statement.on_conflict_do_update(
+            index_elements=[User.email],
+            set_={"name": statement.excluded.name, "version": User.version + 1}
+        ).returning(User.id, User.name, User.email)
+        users.extend(row._asdict() for row in db.session.execute(statement))
+    bump_version("users")
+    db.session.commit()
+
+    _invalidate([user["id"] for user in users])
+    return jsonify(users), 200
+
+@user_routes.route("/users/<int:user_id>", methods=["PUT"])
+def update_user(user_id):
+    User = _user_model()
+    db = current_db()
+    user = User.query.get(user_id)
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+
+    data = request.get_json()
+    user.name = data.get("name", user.name)
+    user.email = data.get("email", user.email)
+    bump_version("users")
+    db.session.commit()
+
+    _invalidate([user_id])
+    return jsonify(user.to_dict()), 200
+
+@user_routes.route("/users/<int:user_id>", methods=["DELETE"])
+def delete_user(user_id):
+    User = _user_model()
+    db = current_db()
+    user = User.query.get(user_id)
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+
+    db.session.delete(user)
+    bump_version("users")
+    db.session.commit()
+
+    _invalidate([user_id])
+    return jsonify({"message": "User deleted successfully"}), 200
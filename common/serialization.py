@@ -0,0 +1,149 @@
+import json
+import threading
+from datetime import date
+
+from sqlalchemy.orm import load_only
+
+try:
+    import orjson
+except ImportError:  # in requirements.txt; the standard library encoder is the fallback
+    orjson = None
+
+_encoder = json.JSONEncoder(sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+# Rows loaded per SELECT when filling cache misses
+_LOAD_CHUNK_SIZE = 500
+
+# Bookkeeping columns that are never part of a serialized row
+_HIDDEN_COLUMNS = {"version"}
+
+
+def encode(payload):
+    """Encode ``payload`` as compact JSON bytes with sorted keys."""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+    return _encoder.encode(payload).encode()
+
+
+class FragmentCache:
+    """
+    Encoded JSON of individual rows, keyed by primary key and row version.
+
+    A fragment is only reused while the row's ``version`` column is unchanged,
+    and the cached tables are declared with ``sqlite_autoincrement`` so that a
+    deleted row's id is never given to a new row: a write from any process
+    makes the stale fragment unreachable. The write handlers also
+    ``invalidate()`` it to free the memory early. When ``max_size`` is reached
+    the oldest fragments are evicted. Only cache tables declared this way.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._fragments = {}
+        self._lock = threading.Lock()
+
+    def get(self, pk, version):
+        entry = self._fragments.get(pk)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        return None
+
+    def set(self, pk, version, fragment):
+        with self._lock:
+            self._fragments.pop(pk, None)
+            while len(self._fragments) >= self.max_size:
+                del self._fragments[next(iter(self._fragments))]
+            self._fragments[pk] = (version, fragment)
+
+    def invalidate(self, pk):
+        with self._lock:
+            self._fragments.pop(pk, None)
+
+    def __len__(self):
+        return len(self._fragments)
+
+
+def render_rows(model, keys, cache=None):
+    """
+    Return the rows identified by ``keys`` as JSON array bytes.
+
+    ``keys`` are rows with ``id`` and ``version`` attributes, in output
+    order. Full rows are loaded, passed through ``to_dict()`` and encoded for
+    the cache misses alone; the array is assembled by concatenating the
+    fragments.
+    """
+    fragments, missing = {}, []
+    for key in keys:
+        fragment = cache.get(key.id, key.version) if cache is not None else None
+        if fragment is None:
+            missing.append(key.id)
+        else:
+            fragments[key.id] = fragment
+
+    for start in range(0, len(missing), _LOAD_CHUNK_SIZE):
+        for row in model.query.filter(model.id.in_(missing[start:start + _LOAD_CHUNK_SIZE])):
+            fragment = encode(row.to_dict())
+            fragments[row.id] = fragment
+            if cache is not None:
+                cache.set(row.id, row.version, fragment)
+
+    # A row deleted between the two queries is simply left out
+    return b"[" + b",".join(fragments[key.id] for key in keys if key.id in fragments) + b"]"
+
+
+def render_list(query, cache=None):
+    """Return the rows of ``query`` as JSON array bytes, selecting only ``(id, version)`` up front."""
+    model = query.column_descriptions[0]["entity"]
+    return render_rows(model, query.with_entities(model.id, model.version).all(), cache)
+
+
+def parse_fields(model, value):
+    """
+    Field names requested by a ``fields=`` query parameter, or None when it is
+    absent. ``id`` is always included, first. Raises ValueError when no field
+    is given or a name is not a serialized column of ``model``.
+    """
+    if value is None:
+        return None
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    if not names:
+        raise ValueError("'fields' must name at least one field")
+    columns = [name for name in model.__table__.columns.keys() if name not in _HIDDEN_COLUMNS]
+    unknown = [name for name in names if name not in columns]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return ["id"] + [name for name in dict.fromkeys(names) if name != "id"]
+
+
+def load_fields(query, fields, *columns):
+    """Restrict the SELECT of ``query`` to ``fields`` and the extra ``columns``."""
+    model = query.column_descriptions[0]["entity"]
+    return query.options(load_only(*(getattr(model, name) for name in fields), *columns))
+
+
+def sparse_dict(row, fields):
+    """The ``to_dict()`` payload of ``row`` restricted to ``fields``."""
+    payload = {}
+    for name in fields:
+        value = getattr(row, name)
+        payload[name] = value.isoformat() if isinstance(value, date) else value
+    return payload
+
+
+def render_fields(query, fields):
+    """Return the rows of ``query`` restricted to ``fields`` as JSON array bytes."""
+    return encode([sparse_dict(row, fields) for row in load_fields(query, fields)])
+
+
+def init_fragment_caches(app, *tables):
+    """Attach one FragmentCache per table name to ``app``."""
+    app.extensions["fragment_caches"] = {
+        table: FragmentCache(app.config["FRAGMENT_CACHE_SIZE"]) for table in tables
+    }
+
+
+def fragment_cache(app, table):
+    """The fragment cache of ``table``, or None when FRAGMENT_CACHE_ENABLED is off."""
+    if not app.config.get("FRAGMENT_CACHE_ENABLED"):
+        return None
+    return app.extensions["fragment_caches"][table]
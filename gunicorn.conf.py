@@ -0,0 +1,87 @@
+"""
+Production serving of the four APIs of host.py with gunicorn: pre-forked
+worker processes, each running a pool of threads. From the repository root::
+
+    pip install gunicorn
+    gunicorn
+
+picks up this file. The settings below can be overridden from the
+environment (``WEB_CONCURRENCY=4 GUNICORN_THREADS=8 gunicorn``) or with
+gunicorn's own options.
+
+Graceful reload: ``kill -HUP <master pid>`` re-reads this file and replaces
+the workers once their requests are done. The apps are loaded once in the
+master before forking (``preload_app``), so HUP does not pick up new code: to
+deploy it, ``kill -USR2`` starts a new master beside the old one, then
+``kill -QUIT`` the old master.
+
+Choosing the worker count
+-------------------------
+
+Each worker is one Python process: requests of a worker share its GIL, so
+CPU-bound work (JSON, routing) only uses more cores through more workers.
+SQLite on the other hand lets a single connection write to a file at a time,
+whichever process it belongs to, and writers waiting for the lock back off
+for up to ``busy_timeout``.
+
+- Read-mostly traffic: one worker per core. More workers than cores only add
+  context switches.
+- Write-heavy traffic: still no more than one worker per core, and fewer if
+  write latency matters more than read throughput. Extra writers only queue
+  for the database lock; they queue more fairly as threads of one process
+  (on the connection pool) than as processes (on the busy timeout).
+
+Measured with the benchmark suite on a single core, 10000 rows and 16
+concurrent clients (``python -m benchmarks run --rows 10000 --requests 1500
+--mode http --concurrency 16 --workers N``):
+
+=============================  ========  ========  ========
+workers                        1         2         4
+=============================  ========  ========  ========
+BDD GET /api/products/<id>     252 r/s   243 r/s   214 r/s
+BDD PUT /api/products/<id>     139 r/s   132 r/s   120 r/s
+  p99                          237 ms    717 ms    914 ms
+TDD POST /api/orders           192 r/s   157 r/s   132 r/s
+  p99                          173 ms    773 ms    1170 ms
+=============================  ========  ========  ========
+
+Re-run it with ``--workers`` on the production hardware before going above
+one worker per core. For bursts of order creation, TDD's write-behind queue
+(``ORDER_WRITE_BEHIND_ENABLED``) groups the inserts of a worker into one
+transaction.
+
+State kept in memory is per worker: the user and fragment caches, the TDD
+order status counters (reconciled with the database every
+``ORDER_COUNTS_RECONCILE_INTERVAL`` seconds), the write-behind queue (its
+tickets can be polled on any worker once written) and the /metrics values.
+"""
+import multiprocessing
+import os
+import sys
+
+wsgi_app = "host:application"
+bind = os.environ.get("BIND", "0.0.0.0:3000")
+
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "gthread"
+# Requests served concurrently by a worker. An app's SQLite pool holds
+# SQLITE_POOL_SIZE + SQLITE_MAX_OVERFLOW connections per process: keep below.
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+# Seconds an idle client connection is kept open between requests
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+# Seconds a worker may spend on one request before it is restarted
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+# Seconds workers get to finish their requests on reload or shutdown
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+
+# Load the apps once, so that the tables are created and the schema upgraded
+# by the master alone rather than by every worker at once
+preload_app = True
+
+
+def post_fork(server, worker):
+    # The apps were loaded by the master: drop the connections it opened
+    host = sys.modules.get("host")
+    if host is not None and "application" in vars(host):
+        host.dispose_engines(host.application)
@@ -0,0 +1,92 @@
+"""
+Single-process host serving the BDD, BDD2, TDD and TDD2 APIs.
+
+Each app keeps its own ``create_app()``, models, routes and database file and
+is mounted under its own prefix, e.g. ``/bdd2/api/factures`` or
+``/tdd/api/orders``. Flask, SQLAlchemy, the code shared by the apps (common/)
+and the rest of the library code are loaded once for the four apps, and there
+is a single startup instead of four.
+
+Run the development server with::
+
+    python host.py
+
+or point any WSGI server at ``host:application``: gunicorn.conf.py runs it with
+process and thread workers for production. asgi.py serves the same apps to
+ASGI servers.
+"""
+import os
+import sys
+from importlib import import_module
+
+from werkzeug.exceptions import NotFound
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# URL prefix -> app directory
+MOUNTS = {
+    "/bdd": "BDD",
+    "/bdd2": "BDD2",
+    "/tdd": "TDD",
+    "/tdd2": "TDD2",
+}
+
+
+def load_app(directory):
+    """
+    Import ``<directory>/app.py`` and return the Flask app built by its
+    ``create_app()``.
+
+    The four apps all use the same top-level module names (``app``,
+    ``config``, ``models``, ``routes``...). The app directory is put first on
+    ``sys.path`` while it is imported, then its modules are removed from
+    ``sys.modules`` so the next app imports its own copies. The Flask app keeps
+    references to the modules it was built from. The ``common`` package lies
+    outside the app directories and is imported once.
+    """
+    app_dir = os.path.join(ROOT, directory)
+    sys.path.insert(0, app_dir)
+    try:
+        return import_module("app").create_app()
+    finally:
+        sys.path.remove(app_dir)
+        for name, module in list(sys.modules.items()):
+            module_file = getattr(module, "__file__", None) or ""
+            if module_file.startswith(app_dir + os.sep):
+                del sys.modules[name]
+
+
+def dispose_engines(application):
+    """
+    Drop, without closing them, the pooled database connections of the apps
+    of ``application`` (built by ``create_host()``). Call it in a process
+    forked after the apps were loaded: a SQLite connection must not be used
+    from two processes, so each worker opens its own.
+    """
+    for app in application.mounts.values():
+        with app.app_context():
+            for engine in app.extensions["sqlalchemy"].engines.values():
+                engine.dispose(close=False)
+
+
+def create_host(mounts=None):
+    """Build the WSGI application dispatching each prefix to its app."""
+    apps = {prefix: load_app(directory) for prefix, directory in (mounts or MOUNTS).items()}
+    return DispatcherMiddleware(NotFound(), apps)
+
+
+def __getattr__(name):
+    # ``host:application`` is built on first use: importing load_app() or
+    # MOUNTS must not create and migrate the databases of the four apps
+    global application
+    if name == "application":
+        application = create_host()
+        return application
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if __name__ == "__main__":
+    from werkzeug.serving import run_simple
+
+    run_simple("0.0.0.0", 3000, create_host(), threaded=True)
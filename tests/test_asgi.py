@@ -0,0 +1,162 @@
+import asyncio
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+import asgi
+from asgi import ASGIAdapter
+
+
+def scope(path="/", method="GET", query_string=b"", headers=()):
+    return {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "root_path": "",
+        "query_string": query_string,
+        "headers": list(headers),
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 50000),
+    }
+
+
+class ASGIAdapterTestCase(unittest.TestCase):
+    def call(self, wsgi_app, request_scope=None, body=(b"",), send=None, max_buffered_chunks=64):
+        """Run one request through an adapter of ``wsgi_app``: (messages sent, exception raised)."""
+        adapter = ASGIAdapter(wsgi_app, max_buffered_chunks=max_buffered_chunks)
+        messages = [{"type": "http.request", "body": part, "more_body": i < len(body) - 1}
+                    for i, part in enumerate(body)]
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.Event().wait()
+
+        async def record(message):
+            sent.append(message)
+
+        async def run():
+            await asyncio.wait_for(adapter(request_scope or scope(), receive, send or record), timeout=5)
+
+        try:
+            asyncio.run(run())
+            error = None
+        except Exception as e:
+            error = e
+        finally:
+            adapter.executor.shutdown(wait=True)
+        return sent, error
+
+    def test_response(self):
+        def app(environ, start_response):
+            start_response("201 Created", [("Content-Type", "text/plain"), ("X-Test", "1")])
+            return [b"a", b"", b"b"]
+
+        sent, error = self.call(app)
+        self.assertIsNone(error)
+        self.assertEqual(sent[0], {"type": "http.response.start", "status": 201,
+                                   "headers": [(b"content-type", b"text/plain"), (b"x-test", b"1")]})
+        self.assertEqual([message["body"] for message in sent[1:]], [b"a", b"b", b""])
+        self.assertFalse(sent[-1].get("more_body"))
+
+    def test_environ(self):
+        seen = {}
+
+        def app(environ, start_response):
+            seen.update(environ, body=environ["wsgi.input"].read())
+            start_response("200 OK", [])
+            return []
+
+        request_scope = scope("/api/café", "POST", b"limit=5",
+                              [(b"content-type", b"application/json"), (b"x-forwarded-for", b"a"),
+                               (b"x-forwarded-for", b"b")])
+        sent, error = self.call(app, request_scope, body=(b'{"na', b'me": 1}'))
+        self.assertIsNone(error)
+        self.assertEqual(seen["body"], b'{"name": 1}')
+        self.assertEqual(seen["REQUEST_METHOD"], "POST")
+        self.assertEqual(seen["PATH_INFO"].encode("latin-1").decode("utf-8"), "/api/café")
+        self.assertEqual(seen["QUERY_STRING"], "limit=5")
+        self.assertEqual(seen["CONTENT_TYPE"], "application/json")
+        self.assertEqual(seen["HTTP_X_FORWARDED_FOR"], "a,b")
+        self.assertEqual(seen["REMOTE_ADDR"], "127.0.0.1")
+        self.assertEqual(sent[0]["status"], 200)
+
+    def test_error_before_response(self):
+        def app(environ, start_response):
+            raise RuntimeError("database is locked")
+
+        sent, error = self.call(app)
+        self.assertIsInstance(error, RuntimeError)
+        self.assertEqual(sent[0]["status"], 500)
+        self.assertEqual(sent[-1], {"type": "http.response.body", "body": b""})
+
+    def test_error_while_streaming(self):
+        closed = threading.Event()
+
+        class Body:
+            def __iter__(self):
+                yield b"["
+                raise RuntimeError("database is locked")
+
+            def close(self):
+                closed.set()
+
+        def app(environ, start_response):
+            start_response("200 OK", [("Content-Type", "application/json")])
+            return Body()
+
+        sent, error = self.call(app)
+        # Not a timeout: the response ends unfinished and the error reaches the server
+        self.assertIsInstance(error, RuntimeError)
+        self.assertEqual(sent, [
+            {"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]},
+            {"type": "http.response.body", "body": b"[", "more_body": True},
+        ])
+        self.assertTrue(closed.is_set())
+
+    def test_client_disconnect_closes_body(self):
+        closed = threading.Event()
+
+        class Body:
+            def __iter__(self):
+                while True:
+                    yield b"x"
+
+            def close(self):
+                closed.set()
+
+        def app(environ, start_response):
+            start_response("200 OK", [])
+            return Body()
+
+        async def send(message):
+            if message["type"] == "http.response.body":
+                raise OSError("client went away")
+
+        sent, error = self.call(app, send=send, max_buffered_chunks=2)
+        self.assertIsInstance(error, OSError)
+        self.assertTrue(closed.wait(5))
+
+    def test_lifespan(self):
+        adapter = ASGIAdapter(None)
+        messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        asyncio.run(adapter({"type": "lifespan"}, receive, send))
+        self.assertEqual(sent, ["lifespan.startup.complete", "lifespan.shutdown.complete"])
+
+    def test_import_builds_nothing(self):
+        self.assertNotIn("application", vars(asgi))
+
+
+if __name__ == "__main__":
+    unittest.main()
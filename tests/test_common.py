@@ -0,0 +1,384 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+from flask import Response
+from sqlalchemy import event, text
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+import host
+from common.cache import LRUCache
+from common.models.engine import TimedQueuePool, engine_options
+from common.profiler import full_scans, init_query_profiler, parameters_shape
+from common.serialization import FragmentCache
+
+# Copies of the apps leave out their databases and tests
+COPY_IGNORE = shutil.ignore_patterns("instance", "tests", "__pycache__", "*.db", "*.db-*")
+
+
+class SharedRoutesTests:
+    """
+    The user routes, caches, metrics and slow query log of common/, run
+    against the app of ``DIRECTORY``, loaded from a copy so that its database
+    is created in a temporary directory.
+    """
+    DIRECTORY = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.workdir = tempfile.mkdtemp()
+        cls.app_dir = os.path.join(cls.workdir, cls.DIRECTORY)
+        shutil.copytree(os.path.join(host.ROOT, cls.DIRECTORY), cls.app_dir, ignore=COPY_IGNORE)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.workdir)
+
+    def setUp(self):
+        self.app = host.load_app(self.app_dir)
+        self.app.config["TESTING"] = True
+        self.client = self.app.test_client()
+        self.db = self.app.extensions["sqlalchemy"]
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.session.remove()
+            self.db.drop_all()
+            self.db.engine.dispose()
+
+    @staticmethod
+    def _dispose(app):
+        with app.app_context():
+            app.extensions["sqlalchemy"].engine.dispose()
+
+    def test_create_user(self):
+        response = self.client.post("/api/users", json={"name": "John Doe", "email": "john@example.com"})
+        self.assertEqual(response.status_code, 201)
+        self.assertIn("John Doe", str(response.data))
+
+    def test_get_users(self):
+        self.client.post("/api/users", json={"name": "John Doe", "email": "john@example.com"})
+        response = self.client.get("/api/users")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("John Doe", str(response.data))
+
+    def test_get_user(self):
+        self.client.post("/api/users", json={"name": "John Doe", "email": "john@example.com"})
+        response = self.client.get("/api/users/1")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("John Doe", str(response.data))
+
+    def test_update_user(self):
+        self.client.post("/api/users", json={"name": "John Doe", "email": "john@example.com"})
+        response = self.client.put("/api/users/1", json={"name": "Jane Doe"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Jane Doe", str(response.data))
+
+    def test_delete_user(self):
+        self.client.post("/api/users", json={"name": "John Doe", "email": "john@example.com"})
+        response = self.client.delete("/api/users/1")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("User deleted successfully", str(response.data))
+
+    def test_create_user_duplicate_email(self):
+        self.client.post("/api/users", json={"name": "John Doe", "email": "john@example.com"})
+        response = self.client.post("/api/users", json={"name": "John Bis", "email": "john@example.com"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Email already exists", str(response.data))
+
+        response = self.client.post("/api/users", json={"name": "Jane Doe", "email": "jane@example.com"})
+        self.assertEqual(response.status_code, 201)
+
+    def test_upsert_users_batch(self):
+        self.client.post("/api/users", json={"name": "John Doe", "email": "john@example.com"})
+        response = self.client.post("/api/users/batch", json=[
+            {"name": "John Updated", "email": "john@example.com"},
+            {"name": "Jane Doe", "email": "jane@example.com"},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json), 2)
+
+        users = {user["email"]: user for user in self.client.get("/api/users").json}
+        self.assertEqual(len(users), 2)
+        self.assertEqual(users["john@example.com"]["name"], "John Updated")
+        self.assertEqual(users["john@example.com"]["id"], 1)
+
+        response = self.client.post("/api/users/batch", json=[{"name": "No Email"}])
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_user_cached(self):
+        self.client.post("/api/users", json={"name": "John Doe", "email": "john@example.com"})
+        cache = self.app.extensions["user_cache"]
+        self.app.config["USER_CACHE_ENABLED"] = True
+
+        self.client.get("/api/users/1")
+        response = self.client.get("/api/users/1")
+        self.assertIn("John Doe", str(response.data))
+        self.assertEqual(cache.stats()["hits"], 1)
+
+        self.client.put("/api/users/1", json={"name": "Jane Doe"})
+        response = self.client.get("/api/users/1")
+        self.assertIn("Jane Doe", str(response.data))
+
+        self.client.delete("/api/users/1")
+        self.assertEqual(self.client.get("/api/users/1").status_code, 404)
+
+    def test_get_user_cache_disabled(self):
+        self.client.post("/api/users", json={"name": "John Doe", "email": "john@example.com"})
+        self.app.config["USER_CACHE_ENABLED"] = False
+
+        self.client.get("/api/users/1")
+        self.client.get("/api/users/1")
+        self.assertEqual(self.app.extensions["user_cache"].stats(), {"size": 0, "hits": 0, "misses": 0})
+
+    def test_users_etag(self):
+        self.client.post("/api/users", json={"name": "John Doe", "email": "john@example.com"})
+        response = self.client.get("/api/users")
+        etag = response.headers["ETag"]
+
+        response = self.client.get("/api/users", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+
+        detail_etag = self.client.get("/api/users/1").headers["ETag"]
+        self.assertNotEqual(detail_etag, etag)
+
+        self.client.put("/api/users/1", json={"name": "Jane Doe"})
+        response = self.client.get("/api/users", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Jane Doe", str(response.data))
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_user_etag_from_cache(self):
+        self.client.post("/api/users", json={"name": "John Doe", "email": "john@example.com"})
+        self.app.config["USER_CACHE_ENABLED"] = True
+        etag = self.client.get("/api/users/1").headers["ETag"]
+
+        statements = []
+        with self.app.app_context():
+            event.listen(self.db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        response = self.client.get("/api/users/1", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get("/api/users/1").headers["ETag"], etag)
+        self.assertEqual(statements, [])
+
+        self.assertNotEqual(self.client.get("/api/users/1?fields=name").headers["ETag"], etag)
+        self.client.put("/api/users/1", json={"name": "Jane Doe"})
+        response = self.client.get("/api/users/1", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+        # The id of a deleted user is not given to a new one
+        etag = response.headers["ETag"]
+        self.client.delete("/api/users/1")
+        self.assertEqual(self.client.post("/api/users", json={"name": "New User", "email": "new@example.com"})
+                         .json["id"], 2)
+        response = self.client.get("/api/users/1", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 404)
+
+    def test_get_users_fragment_cache(self):
+        self.client.post("/api/users", json={"name": "John Doe", "email": "john@example.com"})
+        self.client.post("/api/users", json={"name": "Jane Doe", "email": "jane@example.com"})
+        cache = self.app.extensions["fragment_caches"]["users"]
+
+        response = self.client.get("/api/users")
+        self.assertEqual(response.json, [
+            {"id": 1, "name": "John Doe", "email": "john@example.com"},
+            {"id": 2, "name": "Jane Doe", "email": "jane@example.com"},
+        ])
+        self.assertEqual(len(cache), 2)
+
+        self.client.put("/api/users/1", json={"name": "John Updated"})
+        self.client.post("/api/users/batch", json=[{"name": "Jane Updated", "email": "jane@example.com"}])
+        names = [user["name"] for user in self.client.get("/api/users").json]
+        self.assertEqual(names, ["John Updated", "Jane Updated"])
+
+        self.client.delete("/api/users/1")
+        self.assertEqual(len(self.client.get("/api/users").json), 1)
+        self.assertEqual(len(cache), 1)
+
+        self.app.config["FRAGMENT_CACHE_ENABLED"] = False
+        self.assertEqual(self.client.get("/api/users").json[0]["name"], "Jane Updated")
+
+    def test_fragment_cache_across_apps(self):
+        # A second worker of the same app, sharing its database
+        other = host.load_app(self.app_dir)
+        other_client = other.test_client()
+        self.addCleanup(self._dispose, other)
+
+        self.client.post("/api/users", json={"name": "John Doe", "email": "john@example.com"})
+        self.client.post("/api/users", json={"name": "Jane Doe", "email": "jane@example.com"})
+        self.assertEqual(len(other_client.get("/api/users").json), 2)
+
+        # Deleting the last user then creating one does not reuse its id
+        self.client.delete("/api/users/2")
+        response = self.client.post("/api/users", json={"name": "New User", "email": "new@example.com"})
+        self.assertEqual(response.json["id"], 3)
+        self.assertEqual(other_client.get("/api/users").json, [
+            {"id": 1, "name": "John Doe", "email": "john@example.com"},
+            {"id": 3, "name": "New User", "email": "new@example.com"},
+        ])
+
+    def test_upgrade_adds_autoincrement(self):
+        with self.app.app_context(), self.db.engine.begin() as connection:
+            connection.execute(text("DROP TABLE users"))
+            connection.execute(text(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, "
+                "email VARCHAR(100) NOT NULL UNIQUE, version INTEGER DEFAULT 1 NOT NULL)"
+            ))
+            connection.execute(text(
+                "INSERT INTO users (id, name, email) VALUES (1, 'John Doe', 'john@example.com'), "
+                "(2, 'Jane Doe', 'jane@example.com')"
+            ))
+            connection.execute(text("DELETE FROM users WHERE id = 2"))
+        self._dispose(self.app)
+
+        # Loading the app again upgrades its database
+        self.app = host.load_app(self.app_dir)
+        self.client = self.app.test_client()
+        self.db = self.app.extensions["sqlalchemy"]
+        with self.app.app_context():
+            definition = self.db.session.execute(
+                text("SELECT sql FROM sqlite_master WHERE name = 'users'")).scalar()
+            indexes = self.db.session.execute(
+                text("SELECT name FROM sqlite_master WHERE tbl_name = 'users' AND type = 'index'")).scalars().all()
+        self.assertIn("AUTOINCREMENT", definition)
+        self.assertEqual(len(indexes), 1 + len(self.db.metadata.tables["users"].indexes))
+        self.assertEqual(self.client.get("/api/users/1").json["name"], "John Doe")
+        response = self.client.post("/api/users", json={"name": "New User", "email": "new@example.com"})
+        self.assertEqual(response.json["id"], 2)
+        self.assertEqual(self.client.post("/api/users", json={"name": "Other", "email": "john@example.com"})
+                         .status_code, 400)
+
+    def test_get_users_sparse_fields(self):
+        self.client.post("/api/users", json={"name": "John Doe", "email": "john@example.com"})
+
+        response = self.client.get("/api/users?fields=email")
+        self.assertEqual(response.json, [{"id": 1, "email": "john@example.com"}])
+
+        response = self.client.get("/api/users/1?fields=name")
+        self.assertEqual(response.json, {"id": 1, "name": "John Doe"})
+
+        response = self.client.get("/api/users/1?fields=password")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("password", response.json["error"])
+
+    def test_engine_profile(self):
+        with self.app.app_context():
+            self.assertEqual(self.db.session.execute(text("PRAGMA busy_timeout")).scalar(), 5000)
+            self.assertEqual(self.db.session.execute(text("PRAGMA temp_store")).scalar(), 2)
+
+        config = {"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", "SQLITE_POOL_SIZE": 10,
+                  "SQLITE_MAX_OVERFLOW": 20, "SQLITE_POOL_TIMEOUT": 30}
+        self.assertEqual(engine_options(config), {})
+        config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///users.db"
+        self.assertEqual(engine_options(config), {"poolclass": TimedQueuePool, "pool_size": 10,
+                                                  "max_overflow": 20, "pool_timeout": 30})
+
+    def test_metrics(self):
+        # Requests are recorded when their response is closed, as WSGI servers do
+        self.client.post("/api/users", json={"name": "Metrics", "email": "metrics@example.com"}, buffered=True)
+        self.client.get("/api/users", buffered=True)
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain; version=0.0.4"))
+        body = response.get_data(as_text=True)
+        self.assertIn('http_requests_total{route="/api/users",method="POST",status="201"} 1', body)
+        self.assertIn('http_request_duration_seconds_count{route="/api/users",method="GET"} 1', body)
+        self.assertIn('db_statements_total{route="/api/users",method="GET"}', body)
+        self.assertIn("db_pool_checkout_wait_seconds_count", body)
+        self.assertIn("db_pool_checked_out", body)
+
+    def test_metrics_cover_streamed_body(self):
+        def body():
+            # Runs after the view returned, without its request context
+            with self.app.app_context():
+                for _ in range(3):
+                    self.db.session.execute(text("SELECT 1"))
+            time.sleep(0.05)
+            yield b"done"
+
+        self.app.add_url_rule("/stream", "stream", lambda: Response(body()))
+        self.assertEqual(self.client.get("/stream", buffered=True).data, b"done")
+
+        metrics = self.app.extensions["metrics"]
+        self.assertEqual(metrics.statements[("/stream", "GET")][0], 3)
+        self.assertGreaterEqual(metrics.latency[("/stream", "GET")].sum, 0.05)
+
+    def test_slow_query_log(self):
+        self.app.config.update(SLOW_QUERY_LOG_ENABLED=True, SLOW_QUERY_THRESHOLD=0)
+        init_query_profiler(self.app)
+        self.client.post("/api/users", json={"name": "Slow", "email": "slow@example.com"})
+        with self.assertLogs(self.app.logger, "WARNING") as logs:
+            self.client.get("/api/users")
+            self.client.get("/api/users/1")
+        output = "\n".join(logs.output)
+        self.assertIn("in GET /api/users: full scan of users", output)
+        self.assertIn("in GET /api/users/<int:user_id>", output)
+        self.assertIn("SEARCH users USING INTEGER PRIMARY KEY", output)
+        self.assertIn("parameters: (int", output)
+
+    def test_slow_query_helpers(self):
+        self.assertEqual(parameters_shape((1, "a", None)), "(int, str, NoneType)")
+        self.assertEqual(parameters_shape([(1, 2.0)] * 3, executemany=True), "3 x (int, float)")
+        plan = [(0, "SCAN users"), (0, "SCAN products USING INDEX ix_products_price"), (1, "SCAN TABLE orders")]
+        self.assertEqual(full_scans(plan, {"users", "products", "orders"}), ["users", "orders"])
+        self.assertEqual(full_scans(plan, {"products"}), [])
+
+
+class BDDTestCase(SharedRoutesTests, unittest.TestCase):
+    DIRECTORY = "BDD"
+
+
+class BDD2TestCase(SharedRoutesTests, unittest.TestCase):
+    DIRECTORY = "BDD2"
+
+
+class TDDTestCase(SharedRoutesTests, unittest.TestCase):
+    DIRECTORY = "TDD"
+
+
+class TDD2TestCase(SharedRoutesTests, unittest.TestCase):
+    DIRECTORY = "TDD2"
+
+
+class FragmentCacheTestCase(unittest.TestCase):
+    def test_version_mismatch_misses(self):
+        cache = FragmentCache(max_size=10)
+        cache.set(1, 1, b'{"id":1}')
+        self.assertEqual(cache.get(1, 1), b'{"id":1}')
+        self.assertIsNone(cache.get(1, 2))
+
+    def test_evicts_oldest(self):
+        cache = FragmentCache(max_size=2)
+        cache.set(1, 1, b"a")
+        cache.set(2, 1, b"b")
+        cache.set(3, 1, b"c")
+        self.assertIsNone(cache.get(1, 1))
+        self.assertEqual(len(cache), 2)
+
+
+class LRUCacheTestCase(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_size=2, ttl=60)
+        cache.set(1, "a")
+        cache.set(2, "b")
+        cache.get(1)
+        cache.set(3, "c")
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.get(1), "a")
+        self.assertEqual(cache.get(3), "c")
+
+    def test_entries_expire(self):
+        cache = LRUCache(max_size=2, ttl=0.01)
+        cache.set(1, "a")
+        time.sleep(0.02)
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.stats(), {"size": 0, "hits": 0, "misses": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
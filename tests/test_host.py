@@ -0,0 +1,64 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from werkzeug.test import Client
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+import host
+
+# Copies of the apps leave out their databases and tests
+COPY_IGNORE = shutil.ignore_patterns("instance", "tests", "__pycache__", "*.db", "*.db-*")
+
+
+class HostTestCase(unittest.TestCase):
+    def setUp(self):
+        # The apps are loaded from copies, so their databases are created
+        # in a temporary directory rather than next to the real apps
+        self.workdir = tempfile.mkdtemp()
+        mounts = {}
+        for prefix, directory in host.MOUNTS.items():
+            copy = os.path.join(self.workdir, directory)
+            shutil.copytree(os.path.join(host.ROOT, directory), copy, ignore=COPY_IGNORE)
+            mounts[prefix] = copy
+        self.application = host.create_host(mounts)
+        self.client = Client(self.application)
+
+    def tearDown(self):
+        for app in self.application.mounts.values():
+            with app.app_context():
+                app.extensions["sqlalchemy"].engines[None].dispose()
+        shutil.rmtree(self.workdir)
+
+    def test_import_builds_nothing(self):
+        self.assertNotIn("application", vars(host))
+
+    def test_each_prefix_serves_its_app(self):
+        for url in ("/bdd/api/products", "/bdd2/api/factures", "/tdd/api/orders", "/tdd2/api/products"):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(response.json, [], url)
+        # Each app keeps its own routes and modules
+        self.assertEqual(self.client.get("/bdd/api/factures").status_code, 404)
+        self.assertEqual(self.client.get("/tdd/api/products").status_code, 404)
+        self.assertEqual(self.client.get("/api/users").status_code, 404)
+
+    def test_apps_do_not_share_databases(self):
+        response = self.client.post("/bdd/api/users", json={"name": "Host", "email": "host@example.com"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(self.client.get("/bdd/api/users").json), 1)
+        self.assertEqual(self.client.get("/tdd/api/users").json, [])
+
+    def test_dispose_engines(self):
+        self.client.get("/tdd/api/orders")
+        host.dispose_engines(self.application)
+        for app in self.application.mounts.values():
+            with app.app_context():
+                self.assertEqual(app.extensions["sqlalchemy"].engines[None].pool.checkedout(), 0)
+        self.assertEqual(self.client.get("/tdd/api/orders").status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()